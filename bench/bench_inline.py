@@ -0,0 +1,47 @@
+# Compares text_to_textnodes with the five chained split passes it replaced,
+# on paragraph-heavy text.  Run from the repo root:
+#   python3 bench/bench_inline.py [paragraphs] [repeat]
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+from textnode import TextNode, TextType
+from corpus import make_paragraph
+
+def chained_text_to_textnodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_image(nodes)
+    nodes = split_nodes_link(nodes)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    return nodes
+
+
+def main(argv):
+    paragraphs = int(argv[1]) if len(argv) > 1 else 2000
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+    rng = random.Random(42)
+    texts = [make_paragraph(rng) for _ in range(paragraphs)]
+    for text in texts:
+        assert text_to_textnodes(text) == chained_text_to_textnodes(text)
+
+    results = {}
+    for name, func in (("chained", chained_text_to_textnodes), ("single-pass", text_to_textnodes)):
+        best = min(timeit.repeat(lambda: [func(t) for t in texts], number=1, repeat=repeat))
+        results[name] = best
+        print(f"{name:12} {best * 1000:8.1f} ms for {paragraphs} paragraphs")
+    print(f"speedup      {results['chained'] / results['single-pass']:8.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,93 @@
+# Peak memory of the parsed node trees for a synthetic corpus, with the
+# __slots__ node classes against the previous __dict__-based ones.
+# Run from the repo root:
+#   python3 bench/bench_memory.py [pages]
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import inline_markdown
+import markdown_to_html
+from corpus import make_page
+from inline_markdown import text_to_textnodes
+from markdown_to_html import markdown_to_html_node
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, None, props)
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, None, children, props)
+
+
+# every module-level name the pipeline builds nodes through
+LEGACY_CLASSES = [
+    (inline_markdown, "TextNode", DictTextNode),
+    (inline_markdown, "LeafNode", DictLeafNode),
+    (markdown_to_html, "TextNode", DictTextNode),
+    (markdown_to_html, "ParentNode", DictParentNode),
+]
+
+
+def parse_corpus(pages):
+    # keep everything alive, like a build holding a site's trees would
+    parsed = []
+    for markdown in pages:
+        paragraphs = markdown.split("\n\n")[1:-1]
+        parsed.append((markdown_to_html_node(markdown), [text_to_textnodes(p) for p in paragraphs]))
+    return parsed
+
+
+def measure(pages):
+    tracemalloc.start()
+    parsed = parse_corpus(pages)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del parsed
+    return peak
+
+
+def main(argv):
+    count = int(argv[1]) if len(argv) > 1 else 10000
+    rng = random.Random(42)
+    pages = [make_page(rng, i) for i in range(count)]
+
+    originals = [(module, name, getattr(module, name)) for module, name, _ in LEGACY_CLASSES]
+    for module, name, legacy in LEGACY_CLASSES:
+        setattr(module, name, legacy)
+    try:
+        before = measure(pages)
+    finally:
+        for module, name, original in originals:
+            setattr(module, name, original)
+    after = measure(pages)
+
+    print(f"pages        {count}")
+    print(f"__dict__     {before / 2**20:8.1f} MiB peak")
+    print(f"__slots__    {after / 2**20:8.1f} MiB peak")
+    print(f"saved        {(before - after) / 2**20:8.1f} MiB ({(1 - after / before) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,106 @@
+# Deterministic synthetic site generator shared by the benchmarks.
+import os
+import random
+
+WORDS = "the quick brown fox jumps over lazy dog elves ring shire mordor".split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+DEFAULTS = {
+    "pages": 200,
+    "seed": 42,
+    "paragraphs": 6,      # paragraphs per page
+    "lists": 2,           # lists per page
+    "code_blocks": 1,     # fenced code blocks per page
+    "words": 60,          # words per paragraph
+    "link_density": 0.02, # fraction of words that become links
+    "depth": 2,           # directory levels above each page
+    "fanout": 5,          # sub-directories per level
+    "assets": 10,         # files under static/
+    "asset_size": 256 * 1024,
+}
+
+
+def make_paragraph(rng, words=80, link_density=0.02):
+    out = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < link_density:
+            word = f"[{word}](/blog/{word})"
+        elif roll < link_density + 0.01:
+            word = f"![{word}](/images/{word}.png)"
+        elif roll < link_density + 0.06:
+            word = f"**{word}**"
+        elif roll < link_density + 0.11:
+            word = f"_{word}_"
+        elif roll < link_density + 0.14:
+            word = f"`{word}`"
+        out.append(word)
+    return " ".join(out)
+
+
+def make_page(rng, index, config=DEFAULTS):
+    blocks = [f"# Page {index}"]
+    for _ in range(config["paragraphs"]):
+        blocks.append(make_paragraph(rng, config["words"], config["link_density"]))
+    for _ in range(config["lists"]):
+        items = [make_paragraph(rng, 6, config["link_density"]) for _ in range(5)]
+        if rng.random() < 0.5:
+            blocks.append("\n".join(f"- {item}" for item in items))
+        else:
+            blocks.append("\n".join(f"{i}. {item}" for i, item in enumerate(items, 1)))
+    for _ in range(config["code_blocks"]):
+        lines = [" ".join(rng.choice(WORDS) for _ in range(8)) for _ in range(6)]
+        blocks.append("```\n" + "\n".join(lines) + "\n```")
+    blocks.append("> " + make_paragraph(rng, 20, 0) + "\n> -- someone")
+    return "\n\n".join(blocks) + "\n"
+
+
+def page_dir(index, config=DEFAULTS):
+    parts = []
+    rest = index
+    for level in range(config["depth"]):
+        parts.append(f"section{level}_{rest % config['fanout']}")
+        rest //= config["fanout"]
+    parts.append(f"page{index}")
+    return os.path.join(*parts)
+
+
+def generate_pages(config=DEFAULTS):
+    # (relative dir, markdown) for every page, without touching the disk
+    rng = random.Random(config["seed"])
+    return [(page_dir(i, config), make_page(rng, i, config)) for i in range(config["pages"])]
+
+
+def generate_site(root, config=DEFAULTS):
+    # writes content/, static/ and template.html under root
+    rng = random.Random(config["seed"] + 1)
+    for rel_dir, markdown in generate_pages(config):
+        path = os.path.join(root, "content", rel_dir)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.md"), "w", encoding="utf_8") as f:
+            f.write(markdown)
+    with open(os.path.join(root, "content", "index.md"), "w", encoding="utf_8") as f:
+        f.write("# Home\n\nSynthetic benchmark site.\n")
+
+    static = os.path.join(root, "static")
+    os.makedirs(os.path.join(static, "images"), exist_ok=True)
+    with open(os.path.join(static, "index.css"), "w", encoding="utf_8") as f:
+        f.write("body { margin: 0 auto; max-width: 40em; }\n")
+    for i in range(config["assets"]):
+        with open(os.path.join(static, "images", f"asset{i}.bin"), "wb") as f:
+            f.write(rng.randbytes(config["asset_size"]))
+
+    with open(os.path.join(root, "template.html"), "w", encoding="utf_8") as f:
+        f.write(TEMPLATE)
@@ -0,0 +1,97 @@
+# Times each pipeline stage on a synthetic corpus and prints the results as
+# JSON. Run from the repo root:
+#   python3 bench/run.py --pages 1000 --output bench_output.json
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import corpus
+from htmlnode import BlockType
+from build import BuildConfig, build_site
+from inline_markdown import text_to_textnodes
+from markdown_to_html import block_to_block_type, markdown_to_blocks, markdown_to_html_node
+from static_to_public import copy_from_to
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser()
+    for name, default in corpus.DEFAULTS.items():
+        parser.add_argument("--" + name.replace("_", "-"), type=type(default), default=default)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the best is kept")
+    parser.add_argument("--output", help="write the JSON here instead of stdout")
+    return parser.parse_args(argv)
+
+
+def best_of(repeat, func, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run(config, repeat, root):
+    corpus.generate_site(root, config)
+    pages = [markdown for _, markdown in corpus.generate_pages(config)]
+    blocks = [block for markdown in pages for block in markdown_to_blocks(markdown)]
+    paragraphs = [b for b in blocks if block_to_block_type(b) == BlockType.PARAGRAPH]
+    trees = [markdown_to_html_node(markdown) for markdown in pages]
+    static = os.path.join(root, "static")
+    static_copy = os.path.join(root, "static_copy")
+
+    def clear_static_copy():
+        shutil.rmtree(static_copy, ignore_errors=True)
+
+    site = BuildConfig(os.path.join(root, "content"), os.path.join(root, "docs"),
+                       os.path.join(root, "template.html"), [static])
+
+    def build():
+        build_site(site)
+
+    stages = {
+        "markdown_to_blocks": (len(pages), lambda: [markdown_to_blocks(m) for m in pages], None),
+        "block_to_block_type": (len(blocks), lambda: [block_to_block_type(b) for b in blocks], None),
+        "text_to_textnodes": (len(paragraphs), lambda: [text_to_textnodes(p) for p in paragraphs], None),
+        "to_html": (len(trees), lambda: [t.to_html() for t in trees], None),
+        "copy_from_to": (config["assets"], lambda: copy_from_to(static, static_copy), clear_static_copy),
+        "main": (len(pages) + 1, build, None),
+    }
+    results = {}
+    for name, (items, func, setup) in stages.items():
+        seconds = best_of(repeat, func, setup)
+        results[name] = {"seconds": round(seconds, 6), "items": items, "repeat": repeat}
+    return results
+
+
+def main(argv):
+    args = parse_args(argv)
+    config = {name: getattr(args, name) for name in corpus.DEFAULTS}
+    with tempfile.TemporaryDirectory() as root:
+        stages = run(config, args.repeat, root)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": config,
+        "stages": stages,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf_8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
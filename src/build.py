@@ -0,0 +1,167 @@
+import os
+from build_plan import plan_build
+from incremental import build_assets, build_changes, build_pages, remove_stale_outputs
+from instrument import BuildStats, logger
+from markdown_to_html import BLOCK_CACHE_SIZE, set_block_cache_size, set_render_cache
+
+
+class BuildConfig:
+    # Everything build_site needs, with explicit paths instead of the
+    # ./content, ./docs, ./static and template.html of the command line.
+    # The options mirror main's flags; manifest_path defaults to
+    # .build-manifest.json next to dest_dir and cache_size is in bytes.
+    def __init__(self, content_dir, dest_dir, template_path, static_dirs=(), basepath="/",
+                 incremental=False, manifest_path=None, checksum=False, assets="copy", jobs=1,
+                 block_cache=BLOCK_CACHE_SIZE, cache_dir=None, cache_size=256 * 1024 * 1024,
+                 changes_path=None, shard=None, merge=None, index_path=None):
+        self.content_dir = content_dir
+        self.dest_dir = dest_dir
+        self.template_path = template_path
+        self.static_dirs = list(static_dirs)
+        self.basepath = basepath
+        self.incremental = incremental
+        if manifest_path is None:
+            parent = os.path.dirname(os.path.abspath(dest_dir))
+            manifest_path = os.path.join(parent, ".build-manifest.json")
+        self.manifest_path = manifest_path
+        self.checksum = checksum
+        self.assets = assets
+        self.jobs = jobs
+        self.block_cache = block_cache
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.changes_path = changes_path
+        self.shard = shard
+        self.merge = merge
+        self.index_path = index_path
+
+
+class BuildResult:
+    # What a build did: counts holds the counters of the build summary
+    # ("pages rendered", "assets copied", "block cache hits", ...), stages and
+    # page_stages the seconds per stage. The full BuildStats is in .stats.
+    def __init__(self, stats):
+        self.stats = stats
+        self.counts = stats.counters
+        self.stages = stats.stages
+        self.page_stages = stats.page_stages
+
+    @property
+    def pages_rendered(self):
+        return self.counts.get("pages rendered", 0) + self.counts.get("pages merged", 0)
+
+    @property
+    def pages_skipped(self):
+        return self.counts.get("pages skipped", 0)
+
+    @property
+    def bytes_written(self):
+        return self.counts.get("pages bytes", 0) + self.counts.get("assets bytes", 0)
+
+    @property
+    def cache_hits(self):
+        return self.counts.get("block cache hits", 0) + self.counts.get("render cache hits", 0)
+
+    @property
+    def cache_misses(self):
+        return self.counts.get("block cache misses", 0) + self.counts.get("render cache misses", 0)
+
+    @property
+    def seconds(self):
+        return sum(self.stages.values())
+
+
+def build_site(config, stats=None):
+    # Builds the site described by config in this process and returns a
+    # BuildResult; failed pages raise parallel.BuildError as on the command
+    # line. Fill stats to keep the timings of a build that raised.
+    if stats is None:
+        stats = BuildStats()
+    set_block_cache_size(config.block_cache)
+    render_cache = None
+    if config.cache_dir:
+        from render_cache import RenderCache
+        render_cache = RenderCache(config.cache_dir, config.cache_size)
+    set_render_cache(render_cache)
+
+    dst = config.dest_dir
+    if config.merge:
+        # the shards rendered the pages; dest_dir is only wiped once they check out
+        from shard import merge_shards
+        with stats.stage("plan"):
+            plan = plan_build(config.content_dir, dst, config.static_dirs)
+        with stats.stage("merge"):
+            result = merge_shards(plan, config.merge, config.manifest_path, strategy=config.assets,
+                                  clean=not config.incremental)
+        for name, value in result.items():
+            if name in ("merged", "stale removed"):
+                stats.count("pages merged" if name == "merged" else name, value)
+            else:
+                stats.count("assets " + name, value)
+    else:
+        # one walk over the static dirs and the content feeds every later stage
+        with stats.stage("plan"):
+            plan = plan_build(config.content_dir, dst, config.static_dirs)
+
+        if config.shard:
+            # static files and the change manifest are left to the merge
+            from shard import build_shard
+            with stats.stage("pages"):
+                result = build_shard(plan, config.template_path, config.basepath, config.shard,
+                                     jobs=config.jobs, stats=stats)
+            for name, value in result.items():
+                stats.count("pages " + name, value)
+            if not config.incremental:
+                from shard import SHARD_MANIFEST, load_shard_manifest
+                keep = set(load_shard_manifest(dst)["pages"]) | {SHARD_MANIFEST}
+                remove_stale(config, plan, keep, stats)
+            return BuildResult(stats)
+
+        # assets are synced rather than copied, so an unchanged static tree only costs
+        # a stat walk
+        with stats.stage("sync assets"):
+            result = build_assets(plan, config.manifest_path, checksum=config.checksum,
+                                  strategy=config.assets)
+        for name, value in result.items():
+            stats.count("assets " + name, value)
+
+        # a full build still records the manifest so the next incremental run can use it
+        with stats.stage("pages"):
+            result = build_pages(plan, config.template_path, config.basepath, config.manifest_path,
+                                 force=not config.incremental, jobs=config.jobs, stats=stats)
+        for name, value in result.items():
+            stats.count("pages " + name, value)
+
+        if not config.incremental:
+            keep = {page.rel_dest for page in plan.pages} | {asset.rel_dest for asset in plan.assets}
+            remove_stale(config, plan, keep, stats)
+
+    if config.changes_path:
+        with stats.stage("changes"):
+            result = build_changes(plan, config.manifest_path, config.changes_path)
+        for name, value in result.items():
+            stats.count("outputs " + name, value)
+
+    if config.index_path:
+        from site_index import SiteIndex
+        with stats.stage("index"):
+            with SiteIndex(config.index_path) as index:
+                result = index.update(plan)
+        for name, value in result.items():
+            stats.count("index " + name, value)
+
+    if render_cache is not None:
+        with stats.stage("evict cache"):
+            stats.count("cache evicted", render_cache.evict())
+    return BuildResult(stats)
+
+
+def remove_stale(config, plan, keep, stats):
+    # a full build leaves dest_dir as a wipe and rebuild would, but only
+    # deletes what that wouldn't bring back, so unchanged outputs keep their
+    # mtime (and the manifest survives if it lives in dest_dir)
+    keep.add(os.path.relpath(os.path.abspath(config.manifest_path), plan.dest_dir))
+    with stats.stage("clean"):
+        removed = remove_stale_outputs(plan.dest_dir, keep)
+    logger.debug("removed %d stale file(s) from %s", removed, plan.dest_dir)
+    stats.count("stale removed", removed)
@@ -0,0 +1,81 @@
+import os
+from collections import namedtuple
+from operator import attrgetter
+
+# a markdown page to render and an asset to publish; stat is the
+# os.stat_result scandir already has for the asset
+Page = namedtuple("Page", ["src", "dest", "rel_src", "rel_dest"])
+Asset = namedtuple("Asset", ["src", "dest", "rel_dest", "stat"])
+
+class BuildPlan:
+    # Everything a build has to do, found in a single os.scandir pass over the
+    # source trees: pages to render, assets to publish and output directories
+    # to create (parents before children). Every later stage works off the
+    # plan instead of walking the trees again.
+    def __init__(self, dest_dir):
+        self.dest_dir = os.path.abspath(dest_dir)
+        self.pages = []
+        self.dirs = []
+        self._assets = {}
+        self._seen_dirs = set()
+        self.add_dir(self.dest_dir)
+
+    @property
+    def assets(self):
+        return list(self._assets.values())
+
+    def add_dir(self, path):
+        if path not in self._seen_dirs:
+            self._seen_dirs.add(path)
+            self.dirs.append(path)
+
+    def scan(self, dir_src, pages=True, assets=True):
+        if not os.path.isdir(dir_src):
+            raise Exception('not a directory, takes two dirs as arguments')
+        self._scan(os.path.abspath(dir_src), "", "", pages, assets)
+        return self
+
+    def _scan(self, src, rel_asset, rel_page, pages, assets):
+        # markdown maps to .html both in file and directory names, assets keep
+        # their names (the same mapping copy_from_to and generate_pages_recursive use)
+        with os.scandir(src) as it:
+            entries = sorted(it, key=attrgetter("name"))
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir():
+                nested_asset = os.path.join(rel_asset, name)
+                if assets:
+                    self.add_dir(os.path.join(self.dest_dir, nested_asset))
+                self._scan(entry.path, nested_asset, os.path.join(rel_page, name.replace(".md", ".html")), pages, assets)
+            elif not entry.is_file():
+                continue
+            elif name.endswith(".md"):
+                if pages:
+                    rel_dest = os.path.join(rel_page, name.replace(".md", ".html"))
+                    dest = os.path.join(self.dest_dir, rel_dest)
+                    self.add_dir(os.path.dirname(dest))
+                    self.pages.append(Page(entry.path, dest, os.path.join(rel_asset, name), rel_dest))
+            elif assets:
+                rel_dest = os.path.join(rel_asset, name)
+                # a later scan replaces an asset with the same destination
+                self._assets[rel_dest] = Asset(entry.path, os.path.join(self.dest_dir, rel_dest), rel_dest, entry.stat())
+
+    def make_dirs(self):
+        for path in self.dirs:
+            if not os.path.isdir(path):
+                os.makedirs(path, exist_ok=True)
+
+
+def page_rel_dest(rel_src):
+    # content/a/b.md -> a/b.html, applying the same name mapping as BuildPlan
+    parts = rel_src.split(os.sep)
+    return os.path.join(*[part.replace(".md", ".html") for part in parts])
+
+
+def plan_build(content_dir, dest_dir, static_dirs=()):
+    # static dirs first, so content files win when both have the same path
+    plan = BuildPlan(dest_dir)
+    for static_dir in static_dirs:
+        plan.scan(static_dir, pages=False)
+    plan.scan(content_dir)
+    return plan
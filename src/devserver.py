@@ -0,0 +1,163 @@
+import mimetypes
+import os
+import posixpath
+import shutil
+import threading
+import urllib.parse
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from instrument import logger
+from markdown_to_html import page_values, render_lines
+from template import layout_path, load_template
+
+
+class PageCache:
+    # Renders content pages on request and keeps the most recently used ones,
+    # invalidated when the markdown or its template (layout) changes on disk.
+    def __init__(self, template_path, url_basepath="/", max_pages=256):
+        self.template_path = template_path
+        self.url_basepath = url_basepath
+        self.max_pages = max_pages
+        self.hits = 0
+        self.misses = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, md_path):
+        mtime = os.stat(md_path).st_mtime_ns
+        with self._lock:
+            cached = self._pages.get(md_path)
+        # the layout is only known from the markdown, so a cached page keeps
+        # the path of the template it was rendered with
+        if cached is not None and cached[0] == mtime and load_template(cached[1]) is cached[2]:
+            with self._lock:
+                if md_path in self._pages:
+                    self._pages.move_to_end(md_path)
+                self.hits += 1
+            return cached[3]
+        with self._lock:
+            self.misses += 1
+        with open(md_path, encoding="utf_8") as f:
+            metadata, title, content = render_lines(f, self.url_basepath)
+        path = layout_path(self.template_path, metadata.get("layout"))
+        template = load_template(path)
+        page = template.with_basepath(self.url_basepath).render(
+            page_values(title, content, metadata)
+        ).encode("utf_8")
+        with self._lock:
+            self._pages[md_path] = (mtime, path, template, page)
+            self._pages.move_to_end(md_path)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+
+def resolve(root, url_path):
+    # maps a url path onto a file under root, refusing to leave it
+    parts = [part for part in posixpath.normpath(url_path).split("/") if part]
+    if any(part in (".", "..") for part in parts):
+        return None
+    path = os.path.join(os.path.abspath(root), *parts)
+    if not (path + os.sep).startswith(os.path.abspath(root) + os.sep):
+        return None
+    return path
+
+
+def page_source(content_dir, url_path):
+    # /blog/tom/, /blog/tom and /blog/tom/index.html -> content/blog/tom/index.md,
+    # /about.html -> content/about.md
+    if url_path.endswith(".html"):
+        candidates = [url_path[:-len(".html")] + ".md"]
+    else:
+        candidates = [url_path.rstrip("/") + "/index.md"]
+    for candidate in candidates:
+        path = resolve(content_dir, candidate)
+        if path is not None and os.path.isfile(path):
+            return path
+    return None
+
+
+def make_handler(content_dir, static_dirs, cache):
+    class DevHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.respond(send_body=True)
+
+        def do_HEAD(self):
+            self.respond(send_body=False)
+
+        def respond(self, send_body):
+            parts = urllib.parse.urlsplit(self.path)
+            url_path = urllib.parse.unquote(parts.path)
+            basepath = cache.url_basepath
+            if basepath != "/" and url_path.startswith(basepath):
+                url_path = "/" + url_path[len(basepath):]
+
+            md_path = page_source(content_dir, url_path)
+            if md_path is not None:
+                if not url_path.endswith((".html", "/")):
+                    # relative links in the page only work from the directory url
+                    self.send_response(301)
+                    location = parts.path + "/"
+                    if parts.query:
+                        location += "?" + parts.query
+                    self.send_header("Location", location)
+                    self.end_headers()
+                    return
+                try:
+                    body = cache.render(md_path)
+                except Exception as e:
+                    logger.error("%s: %s", md_path, e)
+                    self.send_error(500, f"{type(e).__name__}: {e}")
+                    return
+                self.send_body(body, "text/html; charset=utf-8", send_body)
+                return
+
+            # content wins over static, like in the build
+            for root in [content_dir] + static_dirs[::-1]:
+                path = resolve(root, url_path)
+                if path is not None and os.path.isfile(path) and not path.endswith(".md"):
+                    self.send_file(path, send_body)
+                    return
+            self.send_error(404)
+
+        def send_body(self, body, content_type, send_body):
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+
+        def send_file(self, path, send_body):
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            with open(path, "rb") as f:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                self.end_headers()
+                if send_body:
+                    shutil.copyfileobj(f, self.wfile)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return DevHandler
+
+
+def make_server(content_dir, static_dirs, template_path, url_basepath="/",
+                host="localhost", port=8888, max_pages=256):
+    cache = PageCache(template_path, url_basepath, max_pages)
+    handler = make_handler(os.path.abspath(content_dir), [os.path.abspath(d) for d in static_dirs], cache)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(content_dir, static_dirs, template_path, url_basepath="/", host="localhost", port=8888, max_pages=256):
+    server = make_server(content_dir, static_dirs, template_path, url_basepath, host, port, max_pages)
+    logger.info("serving %s on http://%s:%d%s, press Ctrl-C to stop",
+                content_dir, host, server.server_address[1], url_basepath)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -7,58 +7,90 @@ class BlockType(Enum):
     QUOTE = "quote"
     UNORDERED_LIST = "unordered_list"
     ORDERED_LIST = "ordered_list"
+# attributes holding urls that get the site's basepath when they are root-relative
+URL_PROPS = ("href", "src")
+
+def rebase_url(url, url_basepath):
+    if url.startswith("/"):
+        return url_basepath + url[1:]
+    return url
+
+
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, url_basepath=None):
         raise NotImplementedError("to_html method not implemented")
 
-    def props_to_html(self):
+    def props_to_html(self, url_basepath=None):
         if self.props is None:
             return ""
-        props_html = ""
-        for prop in self.props:
-            props_html += f' {prop}="{self.props[prop]}"'
-        return props_html
+        if url_basepath is None or url_basepath == "/":
+            return "".join(f' {prop}="{value}"' for prop, value in self.props.items())
+        return "".join(
+            f' {prop}="{rebase_url(value, url_basepath) if prop in URL_PROPS else value}"'
+            for prop, value in self.props.items()
+        )
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, children: {self.children}, {self.props})"
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
 
-    def to_html(self):
+    def to_html(self, url_basepath=None):
         if self.value is None:
             raise ValueError("invalid HTML: no value")
         if self.tag is None:
             return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html(url_basepath)}>{self.value}</{self.tag}>"
 
     def __repr__(self):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
-        if self.tag is None:
-            raise ValueError("invalid HTML: no tag")
-        if self.children is None:
-            raise ValueError("invalid HTML: no children")
-        children_html = ""
-        for child in self.children:
-            children_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{children_html}</{self.tag}>"
+    def to_html(self, url_basepath=None):
+        chunks = []
+        write_html(self, chunks.append, url_basepath)
+        return "".join(chunks)
 
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
 
 
+def write_html(node, write, url_basepath=None):
+    # Serializes node by calling write() with each chunk of html, e.g.
+    # list.append or an open file's write. Walks the tree with an explicit
+    # stack so deeply nested trees don't hit the recursion limit.
+    # Root-relative href/src attributes are prefixed with url_basepath.
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            write(item)
+        elif isinstance(item, ParentNode):
+            if item.tag is None:
+                raise ValueError("invalid HTML: no tag")
+            if item.children is None:
+                raise ValueError("invalid HTML: no children")
+            write(f"<{item.tag}{item.props_to_html(url_basepath)}>")
+            stack.append(f"</{item.tag}>")
+            stack.extend(reversed(item.children))
+        else:
+            write(item.to_html(url_basepath))
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+from parallel import BuildError, render_pages
+from static_to_public import sync_assets
+from template import layout_paths
+
+MANIFEST_VERSION = 3
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_templates(template_path):
+    # the template and its layouts as one hash; with no layouts it is the
+    # template's own hash, so manifests from before layouts stay valid
+    paths = layout_paths(template_path)
+    if len(paths) == 1:
+        return hash_file(template_path)
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(f"{os.path.basename(path)}\0{hash_file(path)}\n".encode("utf_8"))
+    return digest.hexdigest()
+
+
+def new_manifest(template_hash=None, url_basepath=None):
+    return {
+        "version": MANIFEST_VERSION,
+        "template": template_hash,
+        "basepath": url_basepath,
+        "pages": {},
+        "assets": [],
+        # output hashes as of the last build that recorded changes
+        "outputs": {},
+    }
+
+
+def load_manifest(path):
+    # a missing, unreadable or outdated manifest just means a full rebuild
+    if not os.path.isfile(path):
+        return new_manifest()
+    try:
+        with open(path, encoding="utf_8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest()
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+    return manifest
+
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf_8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def remove_output(dest_dir_path, rel_dest):
+    abs_dest = os.path.join(dest_dir_path, rel_dest)
+    if os.path.isfile(abs_dest) or os.path.islink(abs_dest):
+        os.remove(abs_dest)
+    # prune directories left empty, but never the output root itself
+    root = os.path.abspath(dest_dir_path)
+    parent = os.path.dirname(os.path.abspath(abs_dest))
+    while parent != root and parent.startswith(root) and os.path.isdir(parent):
+        if os.listdir(parent):
+            break
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+
+def remove_stale_outputs(dest_dir_path, keep):
+    # delete every file under dest_dir_path whose path relative to it isn't in
+    # keep, i.e. what a wipe and rebuild would not bring back, without
+    # touching the files that stay
+    removed = 0
+    for root, dirs, files in os.walk(dest_dir_path):
+        for name in files:
+            rel_dest = os.path.relpath(os.path.join(root, name), dest_dir_path)
+            if rel_dest not in keep:
+                remove_output(dest_dir_path, rel_dest)
+                removed += 1
+    return removed
+
+
+def build_pages(plan, template_path, url_basepath, manifest_path, force=False, jobs=1, stats=None):
+    # re-render only pages whose source, template (or layouts) or basepath
+    # changed since the build recorded in manifest_path, and delete outputs
+    # whose source is gone
+    old = load_manifest(manifest_path)
+    template_hash = hash_templates(template_path)
+    manifest = new_manifest(template_hash, url_basepath)
+    manifest["assets"] = old["assets"]
+    manifest["outputs"] = old["outputs"]
+    if old["template"] != template_hash or old["basepath"] != url_basepath:
+        force = True
+
+    counts = {"rendered": 0, "skipped": 0, "deleted": 0}
+    stale = []
+    rel_dests = {}
+    for page in plan.pages:
+        entry = {"source": page.rel_src, "hash": hash_file(page.src)}
+        manifest["pages"][page.rel_dest] = entry
+        rel_dests[page.src] = page.rel_dest
+        previous = old["pages"].get(page.rel_dest)
+        if not force and previous == entry and os.path.isfile(page.dest):
+            counts["skipped"] += 1
+            continue
+        stale.append((page.src, page.dest))
+
+    for rel_dest in old["pages"]:
+        if rel_dest not in manifest["pages"]:
+            remove_output(plan.dest_dir, rel_dest)
+            counts["deleted"] += 1
+
+    failures = render_pages(stale, template_path, url_basepath, jobs, stats)
+    counts["rendered"] = len(stale) - len(failures)
+    # failed pages are left out of the manifest so the next build retries them
+    for src, _ in failures:
+        del manifest["pages"][rel_dests[src]]
+
+    save_manifest(manifest_path, manifest)
+    if failures:
+        raise BuildError(failures)
+    return counts
+
+
+def build_assets(plan, manifest_path, checksum=False, strategy="copy"):
+    # sync the planned assets into the output and delete the ones a previous
+    # build published whose source is gone
+    old = load_manifest(manifest_path)
+    counts = {"copied": 0, "unchanged": 0, "deleted": 0, "bytes": 0}
+    synced = sync_assets(plan, checksum, strategy)
+    sizes = {asset.rel_dest: asset.stat.st_size for asset in plan.assets}
+    for rel_dest, copied in synced.items():
+        counts["copied" if copied else "unchanged"] += 1
+        if copied:
+            counts["bytes"] += sizes[rel_dest]
+
+    for rel_dest in old["assets"]:
+        if rel_dest not in synced and rel_dest not in old["pages"]:
+            remove_output(plan.dest_dir, rel_dest)
+            counts["deleted"] += 1
+
+    old["assets"] = sorted(synced)
+    save_manifest(manifest_path, old)
+    return counts
+
+
+def build_changes(plan, manifest_path, changes_path):
+    # Hashes every output of plan and writes the outputs added, modified and
+    # deleted since the last build that recorded changes to changes_path, for
+    # deploys that only upload or purge the delta. An output whose size and
+    # mtime match what was recorded keeps its recorded hash without reading it.
+    manifest = load_manifest(manifest_path)
+    old = manifest["outputs"]
+    outputs = {}
+    targets = [(page.rel_dest, page.dest) for page in plan.pages]
+    targets += [(asset.rel_dest, asset.dest) for asset in plan.assets]
+    for rel_dest, dest in targets:
+        try:
+            st = os.stat(dest)
+        except FileNotFoundError:
+            continue
+        previous = old.get(rel_dest)
+        if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+            digest = previous["hash"]
+        else:
+            digest = hash_file(dest)
+        outputs[rel_dest] = {"hash": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    changes = {"added": [], "modified": [], "deleted": []}
+    for rel_dest in sorted(outputs):
+        previous = old.get(rel_dest)
+        if previous is None:
+            kind = "added"
+        elif previous["hash"] != outputs[rel_dest]["hash"]:
+            kind = "modified"
+        else:
+            continue
+        changes[kind].append({"path": rel_dest.replace(os.sep, "/"), "hash": outputs[rel_dest]["hash"]})
+    for rel_dest in sorted(old.keys() - outputs.keys()):
+        changes["deleted"].append({"path": rel_dest.replace(os.sep, "/"), "hash": old[rel_dest]["hash"]})
+
+    save_manifest(changes_path, changes)
+    manifest["outputs"] = outputs
+    save_manifest(manifest_path, manifest)
+    return {kind: len(entries) for kind, entries in changes.items()}
@@ -3,30 +3,70 @@ from htmlnode import LeafNode
 import re
 
 def text_node_to_html_node(text_node):
-    if text_node.text_type == TextType.TEXT:
+    text_type = text_node.text_type
+    if text_type == TextType.TEXT:
         return LeafNode(None, text_node.text)
-    elif text_node.text_type == TextType.BOLD:
+    elif text_type == TextType.BOLD:
         return LeafNode("b", text_node.text)
-    elif text_node.text_type == TextType.ITALIC:
+    elif text_type == TextType.ITALIC:
         return LeafNode("i", text_node.text)
-    elif text_node.text_type == TextType.CODE:
+    elif text_type == TextType.CODE:
         return LeafNode("code", text_node.text)
-    elif text_node.text_type == TextType.LINK and text_node.url:
+    elif text_type == TextType.LINK and text_node.url:
         return LeafNode("a", text_node.text, {"href": text_node.url})
-    elif text_node.text_type == TextType.IMAGE and text_node.url:
+    elif text_type == TextType.IMAGE and text_node.url:
         return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
     raise Exception("Not implemented")
 
+# Allows one level of nested brackets in alt/link text
+IMAGE_PATTERN = re.compile(r'!\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(([^)]*)\)')
+LINK_PATTERN = re.compile(r'(?<!!)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(([^)]*)\)')
+DELIMITERS = (("`", TextType.CODE), ("**", TextType.BOLD), ("_", TextType.ITALIC))
+
 def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    # Order: images, links, code, bold, italic
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    # One left-to-right pass giving the same nodes as chaining split_nodes_image,
+    # split_nodes_link and split_nodes_delimiter for code, bold and italic.
+    # Images win over links, so links are only looked for between images.
+    nodes = []
+    pos = 0
+    end = len(text)
+    while pos < end:
+        image = IMAGE_PATTERN.search(text, pos)
+        stop = image.start() if image else end
+        for link in LINK_PATTERN.finditer(text, pos, stop):
+            if link.start() > pos:
+                split_delimiters(text[pos:link.start()], nodes)
+            nodes.append(TextNode(link.group(1), TextType.LINK, link.group(2)))
+            pos = link.end()
+        if stop > pos:
+            split_delimiters(text[pos:stop], nodes)
+        if image is None:
+            break
+        nodes.append(TextNode(image.group(1), TextType.IMAGE, image.group(2)))
+        pos = image.end()
+    if not nodes:
+        # the split passes hand back plain text untouched, even when it is empty
+        nodes.append(TextNode(text, TextType.TEXT))
     return nodes
 
+def split_delimiters(text, nodes, level=0):
+    # Same precedence as the old split passes: code, then bold, then italic.
+    # Empty text between delimiters is dropped, like split_nodes_delimiter does.
+    for delimiter, text_type in DELIMITERS[level:]:
+        level += 1
+        if delimiter not in text:
+            continue
+        parts = text.split(delimiter)
+        if len(parts) % 2 == 0:
+            raise ValueError("Unbalanced delimiter in text node.")
+        for i, part in enumerate(parts):
+            if i % 2 == 1:
+                nodes.append(TextNode(part, text_type))
+            elif part:
+                split_delimiters(part, nodes, level)
+        return
+    nodes.append(TextNode(text, TextType.TEXT))
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for node in old_nodes:
@@ -48,77 +88,36 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
                 new_nodes.append(TextNode(part, text_type))
     return new_nodes
 
-def split_nodes_image(old_nodes): 
-    new_nodes = []
-    pattern = r'!\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(([^)]*)\)'
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
-
-        text = node.text
-        images = extract_markdown_images(text)
-        if not images:
-            new_nodes.append(node)
-            continue
-
-        # Build a list of the full markdown image strings
-        image_markdowns = [f"![{alt}]({url})" for alt, url in images]
-        # Split the text on each image markdown, preserving order
-        parts = re.split(pattern, text)
-        # parts will alternate: [text, alt1, url1, text, alt2, url2, text, ...]
-        i = 0
-        while i < len(parts):
-            # Text before image
-            if parts[i]:
-                new_nodes.append(TextNode(parts[i], TextType.TEXT))
-            if i + 2 < len(parts):
-                alt = parts[i+1]
-                url = parts[i+2]
-                new_nodes.append(TextNode(alt, TextType.IMAGE, url))
-            i += 3
-    return new_nodes
+def split_nodes_image(old_nodes):
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
 
 def split_nodes_link(old_nodes):
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK)
+
+def split_nodes_pattern(old_nodes, pattern, text_type):
     new_nodes = []
-    pattern = r'(?<!!)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(([^)]*)\)'
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
 
         text = node.text
-        links = extract_markdown_links(text)
-        if not links:
+        pos = 0
+        for match in pattern.finditer(text):
+            # Text before the image/link
+            if match.start() > pos:
+                new_nodes.append(TextNode(text[pos:match.start()], TextType.TEXT))
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            pos = match.end()
+        if pos == 0:
             new_nodes.append(node)
-            continue
-
-        # Build a list of the full markdown link strings
-        link_markdowns = [f"[{txt}]({url})" for txt, url in links]
-        # Split the text on each link markdown, preserving order
-        parts = re.split(pattern, text)
-        # parts will alternate: [text, link_text1, url1, text, link_text2, url2, text, ...]
-        i = 0
-        while i < len(parts):
-            # Text before link
-            if parts[i]:
-                new_nodes.append(TextNode(parts[i], TextType.TEXT))
-            if i + 2 < len(parts):
-                link_text = parts[i+1]
-                url = parts[i+2]
-                new_nodes.append(TextNode(link_text, TextType.LINK, url))
-            i += 3
+        elif pos < len(text):
+            new_nodes.append(TextNode(text[pos:], TextType.TEXT))
     return new_nodes
 
 def extract_markdown_images(text):
-    # Allows one level of nested brackets in alt text
-    pattern = r'!\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(([^)]*)\)'
-    matches = re.findall(pattern, text)
-    return matches
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text):
-    # Allows one level of nested brackets in link text
-    pattern = r'(?<!!)\[((?:[^\[\]]|\[[^\[\]]*\])*)\]\(([^)]*)\)'
-    matches = re.findall(pattern, text)
-    return matches
+    return LINK_PATTERN.findall(text)
 
@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("static_site_gen")
+
+# the per-page stages generate_page reports, in pipeline order
+PAGE_STAGES = ("read", "parse", "render", "template", "write")
+
+
+class StageTimer:
+    # cheap lap timer: each lap() records the time since the previous one
+    def __init__(self):
+        self.laps = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.laps[name] = self.laps.get(name, 0.0) + now - self._last
+        self._last = now
+
+
+class BuildStats:
+    def __init__(self):
+        self.stages = {}
+        self.page_stages = dict.fromkeys(PAGE_STAGES, 0.0)
+        self.pages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add_page(self, page, timings):
+        self.pages[page] = timings
+        for name, seconds in timings.items():
+            self.page_stages[name] = self.page_stages.get(name, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def slowest_pages(self, n):
+        totals = [(sum(timings.values()), page) for page, timings in self.pages.items()]
+        totals.sort(reverse=True)
+        return [(page, seconds) for seconds, page in totals[:n]]
+
+    def summary(self, slowest=5):
+        lines = []
+        total = sum(self.stages.values())
+        lines.append(f"built {len(self.pages)} page(s) in {total:.3f}s")
+        for name, seconds in self.stages.items():
+            lines.append(f"  {name:<18}{seconds:9.3f}s")
+        if self.pages:
+            lines.append("  per-page stages (summed over pages):")
+            for name, seconds in self.page_stages.items():
+                lines.append(f"    {name:<16}{seconds:9.3f}s")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name:<18}{value:9}")
+        if slowest and self.pages:
+            lines.append("  slowest pages:")
+            for page, seconds in self.slowest_pages(slowest):
+                lines.append(f"    {seconds * 1000:8.2f}ms  {page}")
+        return "\n".join(lines)
+
+    def to_dict(self, slowest=5):
+        return {
+            "stages": self.stages,
+            "page_stages": self.page_stages,
+            "counters": self.counters,
+            "pages": self.pages,
+            "slowest_pages": self.slowest_pages(slowest),
+        }
+
+
+def profile_entries(profiler, limit=30):
+    import pstats  # only --profile needs it
+    stats = pstats.Stats(profiler)
+    entries = []
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        entries.append({
+            "function": f"{filename}:{line}({func})",
+            "calls": calls,
+            "tottime": tottime,
+            "cumtime": cumtime,
+        })
+    entries.sort(key=lambda entry: entry["cumtime"], reverse=True)
+    return entries[:limit]
+
+
+def write_report(path, stats, profiler=None, slowest=5):
+    report = stats.to_dict(slowest)
+    if profiler is not None:
+        report["profile"] = profile_entries(profiler)
+    with open(path, "w", encoding="utf_8") as f:
+        json.dump(report, f, indent=2)
@@ -1,30 +1,118 @@
-import copy
-from static_to_public import copy_from_to
-from markdown_to_html import generate_pages_recursive
+import argparse
+import logging
+from build import BuildConfig, build_site
+from instrument import BuildStats, logger, write_report
+from markdown_to_html import BLOCK_CACHE_SIZE
+from parallel import BuildError
+from static_to_public import PUBLISH_STRATEGIES
 import os
 import sys
-import shutil
+
+CONTENT_DIR = './content'
+DEST_DIR = './docs'
+STATIC_DIR = './static'
+TEMPLATE_PATH = 'template.html'
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog=os.path.basename(argv[0]))
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep ./docs and re-render only pages whose inputs changed")
+    parser.add_argument("--manifest", default=".build-manifest.json",
+                        help="where the source/template hashes of the last build are kept")
+    parser.add_argument("--changes", metavar="PATH",
+                        help="write the output files added, modified and deleted since the last "
+                             "build run with --changes to PATH (JSON, with sha256 hashes)")
+    parser.add_argument("--index", metavar="DB",
+                        help="keep the front matter, title and word count of every page in the "
+                             "SQLite database DB (only changed pages are re-read)")
+    parser.add_argument("--checksum", action="store_true",
+                        help="with --incremental, compare asset contents instead of size and mtime")
+    parser.add_argument("--assets", choices=PUBLISH_STRATEGIES, default="copy",
+                        help="how static files are published: reflink/hardlink/symlink fall "
+                             "back to a plain copy where the filesystem can't do them")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="render pages in N worker processes (0 = one per CPU)")
+    parser.add_argument("--block-cache", type=int, default=BLOCK_CACHE_SIZE, metavar="BLOCKS",
+                        help="how many rendered blocks to reuse across pages (0 disables the cache)")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="keep rendered page bodies in DIR between builds, so a template or "
+                             "full rebuild only re-wraps pages whose markdown didn't change")
+    parser.add_argument("--cache-size", type=int, default=256, metavar="MB",
+                        help="evict the least recently used bodies once --cache-dir outgrows this")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every file")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="run the build under cProfile and write a JSON report of "
+                             "stage, page and function timings (functions of the main process only)")
+    parser.add_argument("--watch", action="store_true",
+                        help="after building, keep polling ./content, ./static and the template "
+                             "and rebuild only what changed")
+    parser.add_argument("--watch-interval", type=float, default=0.25, metavar="SECONDS",
+                        help="how often --watch polls for changes")
+    parser.add_argument("--serve", type=int, nargs="?", const=8888, metavar="PORT",
+                        help="skip the build and serve ./content on PORT (default 8888), "
+                             "rendering each page when it is requested")
+    parser.add_argument("--serve-cache", type=int, default=256, metavar="PAGES",
+                        help="how many rendered pages --serve keeps in memory")
+    parser.add_argument("--shard", type=shard_arg, metavar="I/N",
+                        help="render only the I-th of N deterministic slices of the pages "
+                             "(no static files) and write a shard manifest next to them")
+    parser.add_argument("--merge", nargs="+", metavar="SHARD_DIR",
+                        help="instead of building, combine the outputs of every --shard run "
+                             "with ./static into ./docs, failing on collisions or missing pages")
+    parser.add_argument("--slowest", type=int, default=5,
+                        help="how many of the slowest pages to list in the summary")
+    return parser.parse_args(argv[1:])
+
+def shard_arg(value):
+    from shard import parse_shard
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
 def main(argv):
-    if len(argv) == 2:
-        basepath = argv[1]
-    else: basepath = '/'
-    src = './content'
-    dst = './docs'
-    static_content = './static'
-    verbose = False
-
-    abs_dest = os.path.abspath(dst)
-    if os.path.exists(abs_dest):
-        shutil.rmtree(abs_dest)
-    if verbose:
-        print("STEP 1 removing", dir_dest, 'to remake it at', abs_dest, '\n')
-        
-    copy_from_to(static_content, dst, verbose)
-    copy_from_to(src, dst, verbose)
-    
-    generate_pages_recursive(os.path.abspath(src), "template.html", dst, basepath)
+    args = parse_args(argv)
+    level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(format="%(message)s")
+    logger.setLevel(level)
+
+    if args.serve is not None:
+        from devserver import serve
+        serve(CONTENT_DIR, [STATIC_DIR], TEMPLATE_PATH, args.basepath,
+              port=args.serve, max_pages=args.serve_cache)
+        return
+
+    stats = BuildStats()
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        build_site(build_config(args), stats)
+    except BuildError as e:
+        logger.error("%s", e)
+        sys.exit(1)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            write_report(args.profile, stats, profiler, args.slowest)
+    logger.info("%s", stats.summary(args.slowest))
+    if args.watch:
+        from watch import Watcher
+        Watcher(CONTENT_DIR, [STATIC_DIR], TEMPLATE_PATH, DEST_DIR, args.basepath, args.manifest,
+                strategy=args.assets, interval=args.watch_interval).run()
+
+def build_config(args):
+    return BuildConfig(
+        CONTENT_DIR, DEST_DIR, TEMPLATE_PATH, [STATIC_DIR], args.basepath,
+        incremental=args.incremental, manifest_path=args.manifest, checksum=args.checksum,
+        assets=args.assets, jobs=args.jobs, block_cache=args.block_cache,
+        cache_dir=args.cache_dir, cache_size=args.cache_size * 1024 * 1024,
+        changes_path=args.changes, shard=args.shard, merge=args.merge, index_path=args.index,
+    )
 
 if __name__ == "__main__":
     main(sys.argv)  # the argv[0] is the current filename.
-
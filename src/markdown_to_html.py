@@ -1,102 +1,156 @@
-from genericpath import isfile
-from pydoc import isdata
 from htmlnode import ParentNode, BlockType
 from textnode import TextNode, TextType
 from inline_markdown import text_node_to_html_node, text_to_textnodes
+from template import layout_path, load_template
+from instrument import StageTimer, logger
+from build_plan import BuildPlan
 import re
 import os
+from collections import OrderedDict, namedtuple
+from itertools import chain
 
 def text_to_children(text):
     textnodes = text_to_textnodes(text)
     return [text_node_to_html_node(node) for node in textnodes]
 
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+    return Document(markdown).html_node
+
+def blocks_to_html_node(blocks):
     parent_html_node = ParentNode("div", [])
     for block in blocks:
-        block_type = block_to_block_type(block)
-        if block_type == BlockType.HEADING:
-            match = re.match(r"^(#{1,6}) (.*)", block)
-            if match:
-                level = len(match.group(1))
-                text = match.group(2)
-                children = text_to_children(text)
-                node = ParentNode(f"h{level}", children)
-                parent_html_node.children.append(node)
-        elif block_type == BlockType.CODE:
-            code_content = "\n".join(block.split('\n')[1:-1]) + "\n"
-            code_node = text_node_to_html_node(TextNode(code_content, TextType.CODE))
-            node = ParentNode("pre", [code_node])
-            parent_html_node.children.append(node)
-        elif block_type == BlockType.QUOTE:
-            # Join quote lines with <br> and parse as inline markdown
-            quote_lines = [line.lstrip("> ").rstrip() for line in block.split('\n')]
-            quote_text = "<br>".join(quote_lines)
-            children = text_to_children(quote_text)
-            node = ParentNode("blockquote", children)
-            parent_html_node.children.append(node)
-        elif block_type == BlockType.UNORDERED_LIST:
-            items = [line[2:].strip() for line in block.split('\n')]
-            li_nodes = [ParentNode("li", text_to_children(item)) for item in items]
-            node = ParentNode("ul", li_nodes)
-            parent_html_node.children.append(node)
-        elif block_type == BlockType.ORDERED_LIST:
-            items = [re.sub(r"^\d+\. ", "", line).strip() for line in block.split('\n')]
-            li_nodes = [ParentNode("li", text_to_children(item)) for item in items]
-            node = ParentNode("ol", li_nodes)
-            parent_html_node.children.append(node)
-        else:  # BlockType.PARAGRAPH
-            children = text_to_children(block.replace('\n', ' '))
-            node = ParentNode("p", children)
+        node = block_to_html_node(block.text, block.block_type, block.lines)
+        if node is not None:
             parent_html_node.children.append(node)
     return parent_html_node
 
+def block_to_html_node(block, block_type, lines=None):
+    # lines are the block's lines when the splitter already has them
+    if lines is None:
+        lines = block.split('\n')
+    if block_type == BlockType.HEADING:
+        match = re.match(r"^(#{1,6}) (.*)", block)
+        if match:
+            level = len(match.group(1))
+            text = match.group(2)
+            children = text_to_children(text)
+            return ParentNode(f"h{level}", children)
+        return None
+    elif block_type == BlockType.CODE:
+        code_content = "\n".join(lines[1:-1]) + "\n"
+        code_node = text_node_to_html_node(TextNode(code_content, TextType.CODE))
+        return ParentNode("pre", [code_node])
+    elif block_type == BlockType.QUOTE:
+        # Join quote lines with <br> and parse as inline markdown
+        quote_lines = [line.lstrip("> ").rstrip() for line in lines]
+        quote_text = "<br>".join(quote_lines)
+        children = text_to_children(quote_text)
+        return ParentNode("blockquote", children)
+    elif block_type == BlockType.UNORDERED_LIST:
+        items = [line[2:].strip() for line in lines]
+        li_nodes = [ParentNode("li", text_to_children(item)) for item in items]
+        return ParentNode("ul", li_nodes)
+    elif block_type == BlockType.ORDERED_LIST:
+        items = [ORDERED_ITEM_PATTERN.sub("", line, count=1).strip() for line in lines]
+        li_nodes = [ParentNode("li", text_to_children(item)) for item in items]
+        return ParentNode("ol", li_nodes)
+    else:  # BlockType.PARAGRAPH
+        children = text_to_children(" ".join(lines))
+        return ParentNode("p", children)
+
+HEADING_PATTERN = re.compile(r"#{1,6} ")
+ORDERED_ITEM_PATTERN = re.compile(r"^(\d+)\. ")
+
 def markdown_to_blocks(markdown):
     if not isinstance(markdown, str):
         raise ValueError("Input must be text")
-    lines = markdown.split('\n')
-    blocks = []
+    return [block.text for block in iter_blocks(markdown.split('\n'))]
+
+def iter_blocks(lines):
+    # Yields the blocks of markdown_to_blocks as typed Blocks from any iterable
+    # of lines (e.g. an open file), so only the block being built is kept in
+    # memory. Each line is stripped once and blocks are classified from those
+    # lines, without splitting their text again.
     current_block = []
+    current_stripped = []
     in_code_block = False
 
     for line in lines:
-        is_heading = re.match(r"^#{1,6} ", line.strip())
-        if line.strip().startswith("```"):
+        line = line.rstrip('\n')
+        stripped = line.strip()
+        if stripped.startswith("```"):
             if in_code_block:
                 current_block.append(line)
-                blocks.append('\n'.join(current_block).strip())
+                current_stripped.append(stripped)
+                block = make_block(current_block, current_stripped)
+                if block:
+                    yield block
                 current_block = []
+                current_stripped = []
                 in_code_block = False
             else:
                 if current_block:
-                    blocks.append('\n'.join(current_block).strip())
+                    block = make_block(current_block, current_stripped)
+                    if block:
+                        yield block
                     current_block = []
+                    current_stripped = []
                 current_block.append(line)
+                current_stripped.append(stripped)
                 in_code_block = True
         elif in_code_block:
             current_block.append(line)
-        elif line.strip() == "":
+            current_stripped.append(stripped)
+        elif stripped == "":
             if current_block:
-                blocks.append('\n'.join(current_block).strip())
+                block = make_block(current_block, current_stripped)
+                if block:
+                    yield block
                 current_block = []
-        elif is_heading:
+                current_stripped = []
+        elif HEADING_PATTERN.match(stripped):
             if current_block:
-                blocks.append('\n'.join(current_block).strip())
+                block = make_block(current_block, current_stripped)
+                if block:
+                    yield block
                 current_block = []
-            current_block.append(line)
-            blocks.append('\n'.join(current_block).strip())
-            current_block = []
+                current_stripped = []
+            yield Block(stripped, BlockType.HEADING, [stripped])
         else:
             current_block.append(line)
+            current_stripped.append(stripped)
     if current_block:
-        blocks.append('\n'.join(current_block).strip())
-    return [block for block in blocks if block]
+        block = make_block(current_block, current_stripped)
+        if block:
+            yield block
+
+def make_block(lines, stripped):
+    # The Block for lines as markdown_to_blocks sees them: joined and stripped,
+    # i.e. without leading/trailing blank lines and with the first line
+    # lstripped and the last one rstripped. Returns None if nothing is left.
+    start, end = 0, len(lines)
+    while end > start and not stripped[end - 1]:
+        end -= 1
+    while start < end and not stripped[start]:
+        start += 1
+    if start == end:
+        return None
+    if start or end < len(lines):
+        lines = lines[start:end]
+        stripped = stripped[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return Block("\n".join(lines), classify_lines(lines, stripped), lines)
 
 def block_to_block_type(block):
     lines = block.split('\n')
+    return classify_lines(lines, [line.strip() for line in lines])
+
+def classify_lines(lines, stripped):
+    # stripped holds line.strip() for each of lines
 
     # Heading: 1-6 # followed by a space, only on the first line
-    if re.match(r"^#{1,6} ", lines[0]):
+    if HEADING_PATTERN.match(lines[0]):
         return BlockType.HEADING
 
     # Code block: starts and ends with ```
@@ -104,71 +158,290 @@ def block_to_block_type(block):
         return BlockType.CODE
 
     # Quote block: every line starts with >
-    if all(line.strip().startswith(">") for line in lines if line.strip()):
-        return BlockType.QUOTE
-
     # Unordered list: every line starts with "- "
-    if all(line.strip().startswith("- ") for line in lines if line.strip()):
-        return BlockType.UNORDERED_LIST
-
     # Ordered list: every line starts with incrementing number, dot, space
-    ordered = True
-    for idx, line in enumerate([l for l in lines if l.strip()]):
-        match = re.match(r"^(\d+)\. ", line.strip())
-        if not match or int(match.group(1)) != idx + 1:
-            ordered = False
+    # all three are checked in one pass that stops once none of them can match
+    quote = unordered = ordered = True
+    number = 0
+    for line in stripped:
+        if not line:
+            continue
+        number += 1
+        if quote and not line.startswith(">"):
+            quote = False
+        if unordered and not line.startswith("- "):
+            unordered = False
+        if ordered:
+            match = ORDERED_ITEM_PATTERN.match(line)
+            if not match or int(match.group(1)) != number:
+                ordered = False
+        if not (quote or unordered or ordered):
             break
-    if ordered and len(lines) > 0 and lines[0].strip().startswith("1. "):
+    if quote:
+        return BlockType.QUOTE
+    if unordered:
+        return BlockType.UNORDERED_LIST
+    if ordered and stripped[0].startswith("1. "):
         return BlockType.ORDERED_LIST
 
     # Paragraph
     return BlockType.PARAGRAPH
 
 def extract_title(markdown):
-    pattern = r"^# (.*)"
-    blocks = markdown_to_blocks(markdown)
+    return Document(markdown).title
+
+def blocks_to_title(blocks):
     for block in blocks:
-        if block_to_block_type(block) == BlockType.HEADING and block.startswith('# '):
-            match = re.match(r"^# (.*)", block)
-            if match:
-                return match.group(1).strip()
+        title = block_title(block)
+        if title is not None:
+            return title
     raise Exception("no h1 header found")
 
+def block_title(block):
+    # the text of an h1 block, None for any other block
+    if block.block_type == BlockType.HEADING and block.text.startswith('# '):
+        match = re.match(r"^# (.*)", block.text)
+        if match:
+            return match.group(1).strip()
+    return None
+
+def block_to_text(block):
+    # the text of a Block without its block markup (#, -, 1., >, fences);
+    # inline markup is left in
+    lines = block.lines
+    if block.block_type == BlockType.HEADING:
+        return block.text.lstrip("#").strip()
+    if block.block_type == BlockType.CODE:
+        return "\n".join(lines[1:-1])
+    if block.block_type == BlockType.QUOTE:
+        lines = [line.lstrip("> ") for line in lines]
+    elif block.block_type == BlockType.UNORDERED_LIST:
+        lines = [line[2:] for line in lines]
+    elif block.block_type == BlockType.ORDERED_LIST:
+        lines = [ORDERED_ITEM_PATTERN.sub("", line, count=1) for line in lines]
+    return "\n".join(lines)
+
+def split_front_matter(lines):
+    # A page may start with front matter: "key: value" lines (blank lines
+    # allowed) between two "---" lines. Returns ({key: value}, the lines
+    # after it); without a complete, well formed block nothing is consumed.
+    lines = iter(lines)
+    buffered = []
+    for line in lines:
+        buffered.append(line)
+        stripped = line.strip()
+        if len(buffered) == 1:
+            if stripped != "---":
+                break
+            metadata = {}
+        elif stripped == "---":
+            return metadata, lines
+        elif stripped:
+            key, colon, value = stripped.partition(":")
+            key = key.strip()
+            if not colon or not key:
+                break
+            metadata[key] = value.strip()
+    return {}, chain(buffered, lines)
+
+# A block of markdown text together with its BlockType and its lines
+# (text.split('\n'), as the splitter already had them)
+Block = namedtuple("Block", ["text", "block_type", "lines"])
+
+# how many rendered blocks block_cache keeps by default (0 disables it)
+BLOCK_CACHE_SIZE = 4096
+
+class BlockCache:
+    # LRU of rendered block html keyed by (block type, text, basepath). It is
+    # shared by every page rendered in the process, so disclaimers, footers and
+    # code samples repeated across pages are only tokenized and serialized once.
+    def __init__(self, max_size=BLOCK_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fragments = OrderedDict()
+
+    def __len__(self):
+        return len(self._fragments)
+
+    def resize(self, max_size):
+        self.max_size = max_size
+        while len(self._fragments) > max(max_size, 0):
+            self._fragments.popitem(last=False)
+
+    def render(self, block, url_basepath=None):
+        key = (block.block_type, block.text, url_basepath)
+        fragment = self._fragments.get(key)
+        if fragment is not None:
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return fragment
+        self.misses += 1
+        node = block_to_html_node(block.text, block.block_type, block.lines)
+        fragment = "" if node is None else node.to_html(url_basepath)
+        if self.max_size > 0:
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.max_size:
+                self._fragments.popitem(last=False)
+        return fragment
+
+block_cache = BlockCache()
+
+def set_block_cache_size(max_size):
+    block_cache.resize(max_size)
+
+# the render_cache.RenderCache generate_page reuses page bodies from, if any
+render_cache = None
+
+def set_render_cache(cache):
+    global render_cache
+    render_cache = cache
+
+class Document:
+    # A page parsed once: blocks are split and classified up front, and the
+    # title and html tree are built from them the first time they are used,
+    # so nothing downstream has to re-parse the markdown. It keeps every
+    # block; render_lines streams a page instead.
+    def __init__(self, markdown):
+        if not isinstance(markdown, str):
+            raise ValueError("Input must be text")
+        self.markdown = markdown
+        self._parse(markdown.split('\n'))
+
+    @classmethod
+    def from_lines(cls, lines):
+        # parses an open file (or any iterable of lines) without reading it whole;
+        # .markdown is None then
+        document = cls.__new__(cls)
+        document.markdown = None
+        document._parse(lines)
+        return document
+
+    def _parse(self, lines):
+        self.metadata, lines = split_front_matter(lines)
+        self.blocks = list(iter_blocks(lines))
+        self._title = None
+        self._html_node = None
+
+    @property
+    def title(self):
+        if self._title is None:
+            self._title = blocks_to_title(self.blocks)
+        return self._title
+
+    @property
+    def html_node(self):
+        if self._html_node is None:
+            self._html_node = blocks_to_html_node(self.blocks)
+        return self._html_node
+
+    def to_html(self, url_basepath=None, cache=None):
+        # same as html_node.to_html(), but with a BlockCache each block is
+        # rendered straight to html, reusing what earlier pages rendered
+        if cache is None or cache.max_size <= 0 or not self.blocks:
+            return self.html_node.to_html(url_basepath)
+        return "<div>" + "".join(cache.render(block, url_basepath) for block in self.blocks) + "</div>"
+
+def render_lines(lines, url_basepath=None, cache=None):
+    # (metadata, title, html) as Document.from_lines(lines) would give them,
+    # but every block is rendered and dropped as soon as it is split, so a
+    # page never holds more than one block besides the html made so far
+    metadata, lines = split_front_matter(lines)
+    use_cache = cache is not None and cache.max_size > 0
+    title = None
+    fragments = []
+    for block in iter_blocks(lines):
+        if title is None:
+            title = block_title(block)
+        if use_cache:
+            fragments.append(cache.render(block, url_basepath))
+        else:
+            node = block_to_html_node(block.text, block.block_type, block.lines)
+            if node is not None:
+                fragments.append(node.to_html(url_basepath))
+    if title is None:
+        raise Exception("no h1 header found")
+    return metadata, title, "<div>" + "".join(fragments) + "</div>"
+
+def page_values(title, content, metadata):
+    # the template placeholders of a page: front matter keys, then Title and Content
+    values = dict(metadata)
+    values["Title"] = title
+    values["Content"] = content
+    return values
+
+# what generate_page wrote in this process (identical pages aren't rewritten)
+write_counts = {"pages written": 0, "pages bytes": 0}
+
 def generate_page(from_path, template_path, dest_path, url_basepath):
-    print(f'Generating page from {from_path} to {dest_path} using {template_path}')
-    with open(from_path, encoding="utf_8") as f:
-        markdown = f.read()
-    with open(template_path, encoding="utf_8") as f:
-        template = f.read()
-    parent_node = markdown_to_html_node(markdown).to_html()
-    title = extract_title(markdown)
-    
-    full_page = template.replace( '{{ Title }}', title ).replace( '{{ Content }}', parent_node)
-    full_page = full_page.replace('href="/', f'href="{url_basepath}').replace('src="/', f'src="{url_basepath}')
+    # returns the seconds spent in each of instrument.PAGE_STAGES
+    logger.debug('Generating page from %s to %s using %s', from_path, dest_path, template_path)
+    timer = StageTimer()
+    cached = None
+    if render_cache is not None:
+        key = render_cache.key(from_path, url_basepath)
+        cached = render_cache.get(key)
+    if cached is not None:
+        # only the template has to be applied again
+        title, parent_node, metadata = cached
+        timer.lap("read")
+        timer.lap("parse")
+        timer.lap("render")
+    else:
+        with open(from_path, encoding="utf_8") as f:
+            timer.lap("read")
+            timer.lap("parse")
+            # the file is split and rendered block by block as it is read, so
+            # "render" includes the reading and parsing
+            metadata, title, parent_node = render_lines(f, url_basepath, block_cache)
+        if render_cache is not None:
+            render_cache.put(key, title, parent_node, metadata)
+        timer.lap("render")
+    template = load_template(layout_path(template_path, metadata.get("layout"))).with_basepath(url_basepath)
+    full_page = template.render(page_values(title, parent_node, metadata))
+    timer.lap("template")
     
-    if not os.path.exists(os.path.dirname(dest_path)):
-        os.makedirs(os.path.dirname(dest_path))
+    # workers may create the same directory at once
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
     if os.path.isfile(os.path.abspath(from_path)):
-        with open(os.path.abspath(dest_path), "w") as f:
-            f.write(full_page)
+        if write_if_changed(os.path.abspath(dest_path), full_page):
+            write_counts["pages written"] += 1
+            write_counts["pages bytes"] += os.path.getsize(dest_path)
+        else:
+            logger.debug('%s is unchanged', dest_path)
+    timer.lap("write")
+    return timer.laps
+
+def write_if_changed(path, text):
+    # Leaves path alone when it already holds exactly text (size first, then
+    # bytes), so unchanged pages keep their mtime for rsync and uploads. Real
+    # changes are written to a temp file next to it and renamed over it, so a
+    # crash never leaves a half-written page. Returns whether it wrote.
+    data = text.encode("utf_8")
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    # one writer per process, so the pid keeps concurrent builds apart
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return True
 
     
 def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, url_basepath):
-    if os.path.isdir(dir_path_content):
-        rel_src_paths = os.listdir(dir_path_content)
-    else:
-        rel_src_paths = [dir_path_content]
-        
-    for src in rel_src_paths:
-        if  dir_path_content != src:
-            abs_src = os.path.join(dir_path_content,src)
-        else: abs_src = src
-        nested_dest_dir = os.path.join(dest_dir_path,src.replace(".md",".html"))
-        if os.path.isfile(abs_src) and abs_src.endswith('.md'):
-            print("\nrecurse calls for generate_page(", abs_src, ", to", nested_dest_dir)
-            generate_page(abs_src, template_path, nested_dest_dir, url_basepath)
-            continue
-        elif os.path.isdir(abs_src):
-            generate_pages_recursive(abs_src, template_path, nested_dest_dir, url_basepath)
-            continue
-    
\ No newline at end of file
+    # renders every page under dir_path_content, with no manifest; builds go
+    # through build_plan.plan_build and incremental.build_pages instead
+    plan = BuildPlan(dest_dir_path).scan(dir_path_content, assets=False)
+    for page in plan.pages:
+        logger.debug("generating page %s to %s", page.src, page.dest)
+        generate_page(page.src, template_path, page.dest, url_basepath)
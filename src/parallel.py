@@ -0,0 +1,80 @@
+import os
+import markdown_to_html
+from markdown_to_html import generate_page, set_block_cache_size, set_render_cache
+
+
+class BuildError(Exception):
+    def __init__(self, failures):
+        self.failures = failures
+        lines = [f"{len(failures)} page(s) failed to build:"]
+        for src, error in failures:
+            lines.append(f"  {src}: {error}")
+        super().__init__("\n".join(lines))
+
+
+def resolve_jobs(jobs):
+    if jobs is None or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def init_worker(block_cache_size, render_cache):
+    # workers start with the caches of the process that started them
+    set_block_cache_size(block_cache_size)
+    set_render_cache(render_cache)
+
+
+def worker_counts():
+    # counters that build up in the process rendering the pages
+    counts = dict(markdown_to_html.write_counts)
+    counts["block cache hits"] = markdown_to_html.block_cache.hits
+    counts["block cache misses"] = markdown_to_html.block_cache.misses
+    if markdown_to_html.render_cache is not None:
+        counts["render cache hits"] = markdown_to_html.render_cache.hits
+        counts["render cache misses"] = markdown_to_html.render_cache.misses
+    return counts
+
+
+def render_page(page):
+    # runs in the worker, so it has to catch everything itself and hand back
+    # something picklable instead of killing the pool; the counters of the
+    # worker (cache hits and misses, bytes written) for this page are handed back
+    src, dest, template_path, url_basepath = page
+    before = worker_counts()
+    try:
+        timings = generate_page(src, template_path, dest, url_basepath)
+    except Exception as e:
+        return src, f"{type(e).__name__}: {e}", None, {}
+    counts = {name: value - before[name] for name, value in worker_counts().items()}
+    return src, None, timings, counts
+
+
+def render_pages(pages, template_path, url_basepath, jobs=1, stats=None):
+    # pages is a list of (src, dest); returns the (src, error) failures in page
+    # order and records per-page stage timings in stats when it is given
+    work = [(src, dest, template_path, url_basepath) for src, dest in pages]
+    jobs = min(resolve_jobs(jobs), len(work))
+    if jobs <= 1:
+        results = map(render_page, work)
+    else:
+        # only parallel builds pay for importing multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(work) // (jobs * 4))
+        initargs = (markdown_to_html.block_cache.max_size, markdown_to_html.render_cache)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=initargs) as pool:
+            results = list(pool.map(render_page, work, chunksize=chunksize))
+    failures = []
+    counts = dict.fromkeys(worker_counts(), 0)
+    for src, error, timings, page_counts in results:
+        if error is not None:
+            failures.append((src, error))
+        elif stats is not None:
+            stats.add_page(src, timings)
+        for name, value in page_counts.items():
+            counts[name] += value
+    if stats is not None:
+        if markdown_to_html.block_cache.max_size <= 0:
+            del counts["block cache hits"], counts["block cache misses"]
+        for name, value in counts.items():
+            stats.count(name, value)
+    return failures
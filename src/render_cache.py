@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import tempfile
+from instrument import logger
+
+# part of every key: bump it whenever the markdown -> html output changes, so
+# bodies rendered by an older renderer are never reused
+RENDERER_VERSION = 2
+
+RENDER_CACHE_SIZE = 256 * 1024 * 1024
+
+
+class RenderCache:
+    # Rendered page bodies (title, html and front matter, which don't depend
+    # on the template)
+    # kept on disk between builds, keyed by the markdown's content hash, the
+    # renderer version and the basepath. Entries are written to a unique temp
+    # file and renamed into place, so concurrent builds or workers never see a
+    # partial entry; a hit refreshes the entry's mtime and evict() drops the
+    # least recently used entries once the directory grows past max_bytes.
+    def __init__(self, cache_dir, max_bytes=RENDER_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, md_path, url_basepath):
+        digest = hashlib.sha256(f"{RENDERER_VERSION}\0{url_basepath}\0".encode("utf_8"))
+        with open(md_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def get(self, key):
+        # returns (title, body, metadata) or None; a missing or corrupt entry is a miss
+        path = self.path(key)
+        try:
+            with open(path, encoding="utf_8") as f:
+                entry = json.load(f)
+            title, body, metadata = entry["title"], entry["body"], entry["metadata"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return title, body, metadata
+
+    def put(self, key, title, body, metadata=None):
+        # failing to cache a page never fails the build
+        path = self.path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf_8") as f:
+                json.dump({"title": title, "body": body, "metadata": metadata or {}}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug("could not cache %s: %s", path, e)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def evict(self):
+        # removes the least recently used entries until the cache fits in
+        # max_bytes; returns how many were removed
+        entries = []
+        total = 0
+        for dirpath, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,129 @@
+import json
+import os
+import zlib
+from incremental import build_assets, hash_file, hash_templates, load_manifest, remove_stale_outputs, save_manifest
+from instrument import logger
+from markdown_to_html import write_if_changed
+from parallel import BuildError, render_pages
+
+SHARD_MANIFEST = ".shard-manifest.json"
+SHARD_MANIFEST_VERSION = 2
+
+
+def parse_shard(value):
+    # "i/N" (1-based) -> (i, N); also the argparse type of --shard
+    try:
+        index, shards = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {value!r}")
+    if not 1 <= index <= shards:
+        raise ValueError(f"shard index must be between 1 and {shards}, got {index}")
+    return index, shards
+
+
+def shard_of(rel_src, shards):
+    # stable across runs, machines and python versions (unlike hash())
+    return zlib.crc32(rel_src.replace(os.sep, "/").encode("utf_8")) % shards + 1
+
+
+def build_shard(plan, template_path, url_basepath, shard, jobs=1, stats=None):
+    # Renders the pages of plan that fall in shard (i, N) and records them, with
+    # the hash of the markdown they were rendered from, in the shard manifest
+    # next to them; assets are left to merge_shards.
+    index, shards = shard
+    pages = [page for page in plan.pages if shard_of(page.rel_src, shards) == index]
+    hashes = {page.src: hash_file(page.src) for page in pages}
+    plan.make_dirs()
+    failures = render_pages([(page.src, page.dest) for page in pages], template_path, url_basepath, jobs, stats)
+    failed = {src for src, _ in failures}
+    manifest = {
+        "version": SHARD_MANIFEST_VERSION,
+        "shard": index,
+        "shards": shards,
+        "template": hash_templates(template_path),
+        "basepath": url_basepath,
+        "pages": {page.rel_dest: {"source": page.rel_src, "hash": hashes[page.src]}
+                  for page in pages if page.src not in failed},
+    }
+    save_manifest(os.path.join(plan.dest_dir, SHARD_MANIFEST), manifest)
+    if failures:
+        raise BuildError(failures)
+    return {"rendered": len(pages) - len(failures), "other shards": len(plan.pages) - len(pages)}
+
+
+def load_shard_manifest(shard_dir):
+    path = os.path.join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path, encoding="utf_8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise BuildError([(shard_dir, f"no readable {SHARD_MANIFEST}: {e}")])
+    if not isinstance(manifest, dict) or manifest.get("version") != SHARD_MANIFEST_VERSION:
+        raise BuildError([(shard_dir, f"unsupported {SHARD_MANIFEST}")])
+    return manifest
+
+
+def merge_shards(plan, shard_dirs, manifest_path, strategy="copy", clean=True):
+    # Combines the pages rendered by every shard of a sharded build with the
+    # assets of plan into plan.dest_dir (with clean, deleting whatever else is
+    # in there). Every page of
+    # plan has to come from exactly one shard, rendered from the markdown plan
+    # has now: collisions, pages no shard rendered, pages no longer in the
+    # content and pages rendered from other sources all fail the merge before
+    # anything is written. Unchanged pages are left alone, like in a build.
+    shard_manifests = [(shard_dir, load_shard_manifest(shard_dir)) for shard_dir in shard_dirs]
+    problems = []
+    first = shard_manifests[0][1]
+    for shard_dir, manifest in shard_manifests:
+        for key in ("shards", "template", "basepath"):
+            if manifest[key] != first[key]:
+                problems.append((shard_dir, f"{key} {manifest[key]!r} differs from {first[key]!r}"))
+        if (os.path.abspath(shard_dir) + os.sep).startswith(plan.dest_dir + os.sep):
+            problems.append((shard_dir, "is inside the merge destination"))
+    found = sorted(manifest["shard"] for _, manifest in shard_manifests)
+    if found != list(range(1, first["shards"] + 1)):
+        problems.append((", ".join(shard_dirs), f"shards {found} are not exactly 1..{first['shards']}"))
+
+    sources = {}
+    rendered = {}
+    for shard_dir, manifest in shard_manifests:
+        for rel_dest, entry in manifest["pages"].items():
+            if rel_dest in sources:
+                problems.append((rel_dest, f"rendered by both {sources[rel_dest]} and {shard_dir}"))
+            else:
+                sources[rel_dest] = shard_dir
+                rendered[rel_dest] = entry
+    expected = {page.rel_dest for page in plan.pages}
+    for rel_dest in sorted(expected - sources.keys()):
+        problems.append((rel_dest, "not rendered by any shard"))
+    for rel_dest in sorted(sources.keys() - expected):
+        problems.append((rel_dest, "rendered by a shard but not in the content"))
+    hashes = {}
+    for page in plan.pages:
+        if page.rel_dest not in sources:
+            continue
+        hashes[page.rel_dest] = hash_file(page.src)
+        if rendered[page.rel_dest]["hash"] != hashes[page.rel_dest]:
+            problems.append((page.rel_dest, f"rendered by {sources[page.rel_dest]} from another version of the markdown"))
+    if problems:
+        raise BuildError(problems)
+
+    counts = build_assets(plan, manifest_path, strategy=strategy)
+    # record the pages like a full build would, so --incremental can follow
+    manifest = load_manifest(manifest_path)
+    manifest["template"] = first["template"]
+    manifest["basepath"] = first["basepath"]
+    manifest["pages"] = {}
+    for page in plan.pages:
+        logger.debug("  -> merging %s from %s", page.rel_dest, sources[page.rel_dest])
+        os.makedirs(os.path.dirname(page.dest), exist_ok=True)
+        with open(os.path.join(sources[page.rel_dest], page.rel_dest), encoding="utf_8") as f:
+            write_if_changed(page.dest, f.read())
+        manifest["pages"][page.rel_dest] = {"source": page.rel_src, "hash": hashes[page.rel_dest]}
+    save_manifest(manifest_path, manifest)
+    if clean:
+        keep = expected | {asset.rel_dest for asset in plan.assets}
+        keep.add(os.path.relpath(os.path.abspath(manifest_path), plan.dest_dir))
+        counts["stale removed"] = remove_stale_outputs(plan.dest_dir, keep)
+    counts["merged"] = len(plan.pages)
+    return counts
@@ -0,0 +1,181 @@
+import datetime
+import json
+import os
+import sqlite3
+from htmlnode import BlockType
+from incremental import hash_file
+from inline_markdown import text_to_textnodes
+from instrument import logger
+from markdown_to_html import block_title, block_to_text, iter_blocks, split_front_matter
+
+# stored in PRAGMA user_version; an index with another version is rebuilt
+INDEX_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE pages (
+    source TEXT PRIMARY KEY,  -- markdown path, relative to the content dir
+    path TEXT NOT NULL,       -- output path, relative to the site root
+    title TEXT,               -- the h1, NULL if the page has none
+    date TEXT,                -- the "date" front matter as ISO 8601, NULL if it isn't
+    words INTEGER NOT NULL,
+    hash TEXT NOT NULL,       -- sha256 of the markdown
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    metadata TEXT NOT NULL    -- all of the front matter, as JSON
+);
+CREATE INDEX pages_date ON pages (date);
+CREATE TABLE tags (
+    tag TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (tag, source)
+);
+CREATE INDEX tags_source ON tags (source);
+"""
+
+PAGE_COLUMNS = "pages.source, pages.path, pages.title, pages.date, pages.words, pages.metadata"
+
+
+def block_words(block):
+    # words of the text a block renders: no block markers, and links and
+    # images count their text rather than their url
+    text = block_to_text(block)
+    if block.block_type != BlockType.CODE:
+        try:
+            text = " ".join(node.text for node in text_to_textnodes(text))
+        except ValueError:
+            pass  # unbalanced inline markup: counted as written
+    return len(text.split())
+
+
+def page_date(value):
+    # the "date" front matter normalized to ISO 8601 (YYYY-MM-DD, with the
+    # time if there is one) so it sorts as text; None if it isn't ISO
+    if value is None:
+        return None
+    try:
+        if len(value) == 10:
+            return datetime.date.fromisoformat(value).isoformat()
+        return datetime.datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        return None
+
+
+def page_tags(metadata):
+    # "tags: a, b" or "tags: [a, b]"
+    value = metadata.get("tags", "").strip()
+    if value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    tags = []
+    for tag in value.split(","):
+        tag = tag.strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+class SiteIndex:
+    # Front matter, title and word count of every page in a SQLite database,
+    # so listings (recent posts, tag pages) are queries instead of a parse of
+    # the whole content. update() only re-reads pages whose markdown changed.
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != INDEX_VERSION:
+            with self.connection:
+                self.connection.execute("DROP TABLE IF EXISTS pages")
+                self.connection.execute("DROP TABLE IF EXISTS tags")
+                self.connection.executescript(SCHEMA)
+                self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def update(self, plan):
+        # indexes the pages of plan: a page whose size and mtime are unchanged
+        # isn't read, one whose hash is unchanged isn't parsed, and pages no
+        # longer in plan are dropped
+        known = {row["source"]: row for row in
+                 self.connection.execute("SELECT source, hash, size, mtime_ns FROM pages")}
+        counts = {"indexed": 0, "unchanged": 0, "removed": 0}
+        with self.connection:
+            for page in plan.pages:
+                source = page.rel_src.replace(os.sep, "/")
+                st = os.stat(page.src)
+                row = known.pop(source, None)
+                if row is not None and (row["size"], row["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+                    counts["unchanged"] += 1
+                    continue
+                digest = hash_file(page.src)
+                if row is not None and row["hash"] == digest:
+                    self.connection.execute("UPDATE pages SET size = ?, mtime_ns = ? WHERE source = ?",
+                                            (st.st_size, st.st_mtime_ns, source))
+                    counts["unchanged"] += 1
+                    continue
+                self.index_page(source, page, digest, st)
+                counts["indexed"] += 1
+            for source in known:
+                self.connection.execute("DELETE FROM pages WHERE source = ?", (source,))
+                self.connection.execute("DELETE FROM tags WHERE source = ?", (source,))
+                counts["removed"] += 1
+        return counts
+
+    def index_page(self, source, page, digest, st):
+        # blocks are counted as they are read, so only one is held at a time
+        title = None
+        words = 0
+        with open(page.src, encoding="utf_8") as f:
+            metadata, lines = split_front_matter(f)
+            for block in iter_blocks(lines):
+                if title is None:
+                    title = block_title(block)
+                words += block_words(block)
+        date = page_date(metadata.get("date"))
+        if date is None and "date" in metadata:
+            logger.warning("%s: date %r is not ISO 8601 (YYYY-MM-DD), the page is indexed "
+                           "as undated", page.src, metadata["date"])
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (source, page.rel_dest.replace(os.sep, "/"), title, date, words,
+             digest, st.st_size, st.st_mtime_ns, json.dumps(metadata, sort_keys=True)),
+        )
+        self.connection.execute("DELETE FROM tags WHERE source = ?", (source,))
+        self.connection.executemany("INSERT INTO tags VALUES (?, ?)",
+                                    [(tag, source) for tag in page_tags(metadata)])
+
+    def pages(self, sql, params=()):
+        # rows of a query selecting PAGE_COLUMNS, as dicts with the front
+        # matter decoded and the tags split out
+        result = []
+        for row in self.connection.execute(sql, params):
+            page = dict(row)
+            page["metadata"] = json.loads(page["metadata"])
+            page["tags"] = page_tags(page["metadata"])
+            result.append(page)
+        return result
+
+    def page(self, source):
+        pages = self.pages(f"SELECT {PAGE_COLUMNS} FROM pages WHERE source = ?", (source,))
+        return pages[0] if pages else None
+
+    def recent(self, limit=10, tag=None):
+        # newest first by their "date"; undated pages come last
+        if tag is None:
+            return self.pages(f"SELECT {PAGE_COLUMNS} FROM pages "
+                              "ORDER BY date IS NULL, date DESC, source LIMIT ?", (limit,))
+        return self.pages(f"SELECT {PAGE_COLUMNS} FROM tags JOIN pages USING (source) WHERE tag = ? "
+                          "ORDER BY date IS NULL, date DESC, source LIMIT ?", (tag, limit))
+
+    def tagged(self, tag):
+        return self.recent(limit=-1, tag=tag)
+
+    def tags(self):
+        # [(tag, number of pages)], most used first
+        return [tuple(row) for row in self.connection.execute(
+            "SELECT tag, COUNT(*) AS pages FROM tags GROUP BY tag ORDER BY pages DESC, tag")]
@@ -1,39 +1,118 @@
+import filecmp
 import os
 import shutil
+import stat
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+from instrument import logger
+from build_plan import BuildPlan
 
-def copy_from_to(dir_src, dir_dest, verbose):
-    if not os.path.isdir(dir_src):
-        raise Exception('not a directory, takes two dirs as arguments')
-    if not os.path.exists(dir_src):
-        raise Exception('source directory does not exist')
-    abs_src = os.path.abspath(dir_src)
-    abs_dest = os.path.abspath(dir_dest)
-    if not os.path.exists(abs_dest):
-        os.mkdir(abs_dest)
-    
-    copy_recursive(abs_src, abs_dest, verbose)
-
-def copy_recursive(src, dest, verbose):
-    entries_list = os.listdir(src)
-    if verbose:
-        print("source dir contains:", entries_list, '\n')
-    dest_nested = dest
-    for entr in entries_list:
-        entr_path = os.path.join(src, entr)
-        if os.path.isdir(entr_path):            
-            dest_nested = os.path.join(dest, entr)
-            if verbose:
-                print(" filepath:", os.path.abspath(entr_path))
-                print(f'  ->  making dir {entr} at dest={dest_nested}')
-                print(f"\ndoing recursive: copy_recursive({entr}, {dest_nested})")
-            os.mkdir(dest_nested)
-            copy_recursive(entr_path, dest_nested, verbose)
-        elif os.path.isfile(entr_path) and not entr.endswith('.md'):
-            if verbose:
-                print(" filepath:", os.path.abspath(entr_path))
-                print(f"   -> coppying file {entr} to {dest}\n")
-            shutil.copy(entr_path,dest)
-            
-            
-
-    
\ No newline at end of file
+def copy_from_to(dir_src, dir_dest):
+    copy_assets(BuildPlan(dir_dest).scan(dir_src, pages=False))
+
+def copy_assets(plan):
+    plan.make_dirs()
+    for asset in plan.assets:
+        logger.debug("  -> copying file %s to %s", asset.src, asset.dest)
+        shutil.copy(asset.src, asset.dest)
+
+def sync_from_to(dir_src, dir_dest, checksum=False, strategy="copy"):
+    # Like copy_from_to, but only copies files that are new or whose size or
+    # mtime differ (or, with checksum, whose bytes differ), and keeps their
+    # timestamps, so syncing an unchanged tree is just a stat walk.
+    # Files are published with publish_file(strategy).
+    # Returns {path relative to dir_dest: True if it was copied}.
+    plan = BuildPlan(dir_dest).scan(dir_src, pages=False)
+    return sync_assets(plan, checksum, strategy)
+
+def sync_assets(plan, checksum=False, strategy="copy"):
+    plan.make_dirs()
+    synced = {}
+    for asset in plan.assets:
+        synced[asset.rel_dest] = sync_file(asset.src, asset.dest, asset.stat, checksum, strategy)
+    return synced
+
+def sync_file(src, dest, src_stat, checksum=False, strategy="copy"):
+    # dest is looked at itself (lstat), so a symlink or hardlink left by an
+    # earlier build with another strategy is re-published instead of passing
+    # for an up-to-date copy, and so is a copy when hardlinking (unless it is
+    # on another device, where it can't be linked anyway)
+    try:
+        dest_stat = os.lstat(dest)
+    except FileNotFoundError:
+        dest_stat = None
+    if dest_stat is not None and stat.S_ISLNK(dest_stat.st_mode):
+        if strategy == "symlink" and os.readlink(dest) == os.path.abspath(src):
+            return False
+        dest_stat = None
+    elif dest_stat is not None and strategy != "hardlink" and \
+            (dest_stat.st_dev, dest_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+        dest_stat = None
+    elif strategy == "symlink":
+        dest_stat = None
+    elif dest_stat is not None and strategy == "hardlink" and \
+            dest_stat.st_dev == src_stat.st_dev and dest_stat.st_ino != src_stat.st_ino:
+        dest_stat = None
+    if dest_stat is not None and dest_stat.st_size == src_stat.st_size:
+        if checksum:
+            if filecmp.cmp(src, dest, shallow=False):
+                return False
+        elif dest_stat.st_mtime_ns == src_stat.st_mtime_ns:
+            return False
+    used = publish_file(src, dest, strategy)
+    logger.debug("  -> synced file %s to %s (%s)", src, dest, used)
+    return True
+
+# ways publish_file can put an asset in place, cheapest on disk first
+PUBLISH_STRATEGIES = ("copy", "reflink", "hardlink", "symlink")
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+def publish_file(src, dest, strategy="copy"):
+    # Puts src at dest using strategy and falls back to a plain copy when the
+    # filesystem or platform can't do it. Returns the strategy actually used.
+    #   reflink:  copy-on-write clone (btrfs, xfs, ...), else copy_file_range
+    #   hardlink: same inode, so nothing in ./docs may be edited in place
+    #   symlink:  only for local previews, git/GitHub Pages won't follow it
+    if os.path.lexists(dest):
+        # never write through an old link into the source file
+        os.remove(dest)
+    try:
+        if strategy == "hardlink":
+            os.link(src, dest)
+            return strategy
+        if strategy == "symlink":
+            os.symlink(os.path.abspath(src), dest)
+            return strategy
+        if strategy == "reflink":
+            reflink(src, dest)
+            shutil.copystat(src, dest)
+            return strategy
+    except OSError as e:
+        logger.debug("  -> %s %s failed (%s), copying instead", strategy, src, e)
+        if os.path.lexists(dest):
+            os.remove(dest)
+    shutil.copy2(src, dest)
+    return "copy"
+
+def reflink(src, dest):
+    if fcntl is None and not hasattr(os, "copy_file_range"):
+        raise OSError("reflink is not supported on this platform")
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        if fcntl is not None:
+            try:
+                fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+                return
+            except OSError:
+                if not hasattr(os, "copy_file_range"):
+                    raise
+        # in-kernel copy, which some filesystems turn into a clone as well
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdest.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
@@ -0,0 +1,81 @@
+import os
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+class Template:
+    # A template compiled once into literal segments with named slots between
+    # them, so rendering a page is a single join (or a series of writes)
+    # instead of one full copy of the page per placeholder.
+    def __init__(self, text):
+        self.text = text
+        self.segments = []
+        self.slots = []
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            self.segments.append(text[pos:match.start()])
+            self.slots.append((match.group(1), match.group(0)))
+            pos = match.end()
+        self.segments.append(text[pos:])
+        self._rebased = {}
+
+    def with_basepath(self, url_basepath):
+        # root-relative href/src in the template itself, rewritten once per
+        # basepath rather than over every rendered page
+        if url_basepath == "/":
+            return self
+        rebased = self._rebased.get(url_basepath)
+        if rebased is None:
+            text = self.text.replace('href="/', f'href="{url_basepath}').replace('src="/', f'src="{url_basepath}')
+            rebased = Template(text)
+            self._rebased[url_basepath] = rebased
+        return rebased
+
+    def chunks(self, values):
+        # placeholders without a value are left in the output untouched
+        for segment, (name, raw) in zip(self.segments, self.slots):
+            yield segment
+            yield values.get(name, raw)
+        yield self.segments[-1]
+
+    def render(self, values):
+        return "".join(self.chunks(values))
+
+    def write(self, write, values):
+        for chunk in self.chunks(values):
+            write(chunk)
+
+
+# abspath -> (mtime_ns, Template); any number of layouts can be cached side by side
+_template_cache = {}
+
+# pages pick another template with a "layout: post" front matter line, which
+# is looked up as layouts/post.html next to the main template
+LAYOUTS_DIR = "layouts"
+
+def layout_path(template_path, layout=None):
+    if not layout:
+        return template_path
+    if os.path.basename(layout) != layout or layout.startswith("."):
+        raise ValueError(f"layout must be a file name in {LAYOUTS_DIR}/, got {layout!r}")
+    return os.path.join(os.path.dirname(template_path), LAYOUTS_DIR, layout + ".html")
+
+def layout_paths(template_path):
+    # the main template and every layout next to it, in a stable order
+    layouts_dir = os.path.join(os.path.dirname(template_path), LAYOUTS_DIR)
+    paths = [template_path]
+    if os.path.isdir(layouts_dir):
+        paths += sorted(os.path.join(layouts_dir, name) for name in os.listdir(layouts_dir)
+                        if name.endswith(".html"))
+    return paths
+
+def load_template(path):
+    key = os.path.abspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(key, encoding="utf_8") as f:
+        template = Template(f.read())
+    _template_cache[key] = (mtime, template)
+    return template
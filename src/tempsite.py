@@ -0,0 +1,24 @@
+import os
+import tempfile
+import unittest
+
+
+class TempSiteTestCase(unittest.TestCase):
+    # Base for tests that build a site on disk: every test gets a fresh
+    # temporary directory (self.tmp) that is removed afterwards. write and read
+    # take paths relative to it, or absolute ones.
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        path = os.path.join(self.tmp.name, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf_8") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(os.path.join(self.tmp.name, path), encoding="utf_8") as f:
+            return f.read()
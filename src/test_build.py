@@ -0,0 +1,103 @@
+import os
+import unittest
+from build import BuildConfig, build_site
+from parallel import BuildError
+from tempsite import TempSiteTestCase
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestBuildSite(TempSiteTestCase):
+    def make_site(self, name, pages=2):
+        root = os.path.join(self.tmp.name, name)
+        self.write(os.path.join(root, "template.html"), TEMPLATE)
+        for i in range(pages):
+            self.write(os.path.join(root, "content", f"p{i}", "index.md"), f"# {name} {i}\n\nshared")
+        self.write(os.path.join(root, "static", "index.css"), "body {}")
+        return BuildConfig(
+            os.path.join(root, "content"), os.path.join(root, "docs"),
+            os.path.join(root, "template.html"), [os.path.join(root, "static")],
+        )
+
+    def test_builds_several_sites_in_process(self):
+        cwd = os.getcwd()
+        for name, pages in (("one", 2), ("two", 3)):
+            config = self.make_site(name, pages)
+            result = build_site(config)
+            self.assertEqual(result.pages_rendered, pages)
+            self.assertEqual(result.counts["assets copied"], 1)
+            with open(os.path.join(config.dest_dir, "p1", "index.html"), encoding="utf_8") as f:
+                html = f.read()
+            self.assertEqual(html, f"<title>{name} 1</title><body><div><h1>{name} 1</h1><p>shared</p></div></body>")
+            self.assertEqual(result.bytes_written,
+                             len("body {}") + sum(
+                                 os.path.getsize(os.path.join(config.dest_dir, f"p{i}", "index.html"))
+                                 for i in range(pages)))
+            self.assertGreater(result.cache_hits, 0)
+            self.assertIn("pages", result.stages)
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, name, ".build-manifest.json")))
+        self.assertEqual(os.getcwd(), cwd)
+
+    def test_incremental(self):
+        config = self.make_site("site")
+        build_site(config)
+        config.incremental = True
+        result = build_site(config)
+        self.assertEqual((result.pages_rendered, result.pages_skipped), (0, 2))
+        self.assertEqual(result.bytes_written, 0)
+
+    def test_full_build_keeps_unchanged_outputs(self):
+        config = self.make_site("site", pages=3)
+        build_site(config)
+        page = os.path.join(config.dest_dir, "p1", "index.html")
+        css = os.path.join(config.dest_dir, "index.css")
+        os.utime(page, (1000000000, 1000000000))
+        css_mtime = os.stat(css).st_mtime_ns
+        self.write(os.path.join(config.dest_dir, "stray", "old.html"), "left behind")
+        os.remove(os.path.join(config.content_dir, "p2", "index.md"))
+
+        result = build_site(config)
+        self.assertEqual(result.pages_rendered, 2)
+        self.assertEqual(os.stat(page).st_mtime, 1000000000)
+        self.assertEqual(os.stat(css).st_mtime_ns, css_mtime)
+        self.assertEqual(sorted(os.listdir(config.dest_dir)), ["index.css", "p0", "p1"])
+        self.assertEqual(result.counts["stale removed"], 1)
+
+    def test_manifest_in_dest_dir_survives(self):
+        config = self.make_site("site")
+        config.manifest_path = os.path.join(config.dest_dir, ".build-manifest.json")
+        build_site(config)
+        build_site(config)
+        self.assertTrue(os.path.isfile(config.manifest_path))
+
+    def test_layouts(self):
+        config = self.make_site("site")
+        layout = os.path.join(os.path.dirname(config.template_path), "layouts", "post.html")
+        self.write(layout, "<article>{{ Title }}</article>")
+        self.write(os.path.join(config.content_dir, "p1", "index.md"), "---\nlayout: post\n---\n# Post")
+        page = os.path.join(config.dest_dir, "p1", "index.html")
+        build_site(config)
+        self.assertEqual(self.read(page), "<article>Post</article>")
+        self.assertTrue(self.read(os.path.join(config.dest_dir, "p0", "index.html")).startswith("<title>"))
+
+        # an incremental build re-renders when a layout changes
+        config.incremental = True
+        self.assertEqual(build_site(config).pages_rendered, 0)
+        self.write(layout, "<section>{{ Title }}</section>")
+        self.assertEqual(build_site(config).pages_rendered, 2)
+        self.assertEqual(self.read(page), "<section>Post</section>")
+
+        self.write(os.path.join(config.content_dir, "p0", "index.md"), "---\nlayout: missing\n---\n# P0")
+        with self.assertRaises(BuildError):
+            build_site(config)
+
+    def test_failures_raise(self):
+        config = self.make_site("site")
+        self.write(os.path.join(config.content_dir, "bad", "index.md"), "no title")
+        with self.assertRaises(BuildError):
+            build_site(config)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from build_plan import plan_build
+
+
+class TestBuildPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        for path, text in [
+            (os.path.join(self.content, "index.md"), "# Home"),
+            (os.path.join(self.content, "blog", "b", "index.md"), "# B"),
+            (os.path.join(self.content, "blog", "a", "index.md"), "# A"),
+            (os.path.join(self.content, "blog", "a", "photo.png"), "png"),
+            (os.path.join(self.static, "index.css"), "css"),
+            (os.path.join(self.static, "images", "logo.png"), "static logo"),
+            (os.path.join(self.content, "images", "logo.png"), "content logo"),
+        ]:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf_8") as f:
+                f.write(text)
+        os.makedirs(os.path.join(self.static, "empty"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_are_sorted_and_mapped_to_html(self):
+        plan = plan_build(self.content, self.dest, [self.static])
+        self.assertEqual(
+            [page.rel_dest for page in plan.pages],
+            [os.path.join("blog", "a", "index.html"), os.path.join("blog", "b", "index.html"), "index.html"],
+        )
+        self.assertEqual(plan.pages[0].src, os.path.join(self.content, "blog", "a", "index.md"))
+        self.assertEqual(plan.pages[0].rel_src, os.path.join("blog", "a", "index.md"))
+        self.assertEqual(plan.pages[0].dest, os.path.join(self.dest, "blog", "a", "index.html"))
+
+    def test_assets_from_every_tree(self):
+        plan = plan_build(self.content, self.dest, [self.static])
+        assets = {asset.rel_dest: asset for asset in plan.assets}
+        self.assertEqual(
+            sorted(assets),
+            sorted([os.path.join("blog", "a", "photo.png"), "index.css", os.path.join("images", "logo.png")]),
+        )
+        # content is scanned after static and wins
+        self.assertEqual(assets[os.path.join("images", "logo.png")].src,
+                         os.path.join(self.content, "images", "logo.png"))
+        self.assertEqual(assets["index.css"].stat.st_size, 3)
+
+    def test_dirs_parents_first(self):
+        plan = plan_build(self.content, self.dest, [self.static])
+        self.assertEqual(plan.dirs[0], os.path.abspath(self.dest))
+        self.assertIn(os.path.join(os.path.abspath(self.dest), "empty"), plan.dirs)
+        for path in plan.dirs[1:]:
+            self.assertLess(plan.dirs.index(os.path.dirname(path)), plan.dirs.index(path))
+        plan.make_dirs()
+        self.assertTrue(os.path.isdir(os.path.join(self.dest, "blog", "b")))
+
+    def test_not_a_directory(self):
+        with self.assertRaises(Exception):
+            plan_build(os.path.join(self.content, "index.md"), self.dest)
+
+
+if __name__ == "__main__":
+    unittest.main()
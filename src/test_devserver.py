@@ -0,0 +1,100 @@
+import http.client
+import os
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from devserver import PageCache, make_server, page_source, resolve
+from tempsite import TempSiteTestCase
+
+
+class TestDevServer(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, '<title>{{ Title }}</title><a href="/">home</a>{{ Content }}')
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/)")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\nhello")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nme")
+        self.write(os.path.join(self.content, "blog", "pic.png"), "content png")
+        self.write(os.path.join(self.static, "style.css"), "body {}")
+
+    def test_page_source(self):
+        blog = os.path.join(self.content, "blog", "index.md")
+        self.assertEqual(page_source(self.content, "/blog/"), blog)
+        self.assertEqual(page_source(self.content, "/blog"), blog)
+        self.assertEqual(page_source(self.content, "/blog/index.html"), blog)
+        self.assertEqual(page_source(self.content, "/about.html"),
+                         os.path.join(self.content, "about.md"))
+        self.assertIsNone(page_source(self.content, "/missing/"))
+
+    def test_resolve_stays_in_root(self):
+        for path in ("/../template.html", "/blog/../../template.html"):
+            self.assertEqual(resolve(self.content, path),
+                             os.path.join(os.path.abspath(self.content), "template.html"))
+
+    def test_cache_invalidation(self):
+        cache = PageCache(self.template, max_pages=1)
+        about = os.path.join(self.content, "about.md")
+        first = cache.render(about)
+        self.assertIn(b"<title>About</title>", first)
+        self.assertIs(cache.render(about), first)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        self.write(about, "# About me\n\nme")
+        os.utime(about, ns=(1, 1))
+        self.assertIn(b"<title>About me</title>", cache.render(about))
+
+        self.write(self.template, "<h1>{{ Title }}</h1>")
+        os.utime(self.template, ns=(2, 2))
+        self.assertEqual(cache.render(about), b"<h1>About me</h1>")
+
+        self.write(os.path.join(os.path.dirname(self.template), "layouts", "plain.html"), "{{ Content }}")
+        self.write(about, "---\nlayout: plain\n---\n# About me")
+        os.utime(about, ns=(3, 3))
+        self.assertEqual(cache.render(about), b"<div><h1>About me</h1></div>")
+        self.assertEqual(cache.render(about), b"<div><h1>About me</h1></div>")
+        self.assertEqual(cache.hits, 2)
+
+        # only one page fits
+        cache.render(os.path.join(self.content, "index.md"))
+        self.assertEqual(len(cache._pages), 1)
+
+    def test_serve(self):
+        server = make_server(self.content, [self.static], self.template, "/site/", port=0)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            base = f"http://localhost:{server.server_address[1]}/site"
+
+            def get(path):
+                with urllib.request.urlopen(base + path) as response:
+                    return response.headers["Content-Type"], response.read()
+
+            content_type, body = get("/")
+            self.assertEqual(content_type, "text/html; charset=utf-8")
+            self.assertIn(b'<a href="/site/">home</a>', body)
+            self.assertIn(b'<a href="/site/blog/">post</a>', body)
+            self.assertIn(b"<p>hello</p>", get("/blog")[1])
+            self.assertEqual(get("/style.css"), ("text/css", b"body {}"))
+            self.assertEqual(get("/blog/pic.png")[1], b"content png")
+            connection = http.client.HTTPConnection("localhost", server.server_address[1])
+            connection.request("GET", "/site/blog?draft=1")
+            response = connection.getresponse()
+            self.assertEqual((response.status, response.getheader("Location")), (301, "/site/blog/?draft=1"))
+            connection.close()
+            for path in ("/missing/", "/about.md", "/../template.html"):
+                with self.assertRaises(urllib.error.HTTPError) as cm:
+                    get(path)
+                self.assertEqual(cm.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import io
 import unittest
-from htmlnode import LeafNode, ParentNode, HTMLNode
+from htmlnode import LeafNode, ParentNode, HTMLNode, write_html
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -49,6 +50,10 @@ class TestHTMLNode(unittest.TestCase):
             "HTMLNode(p, What a strange world, children: None, {'class': 'primary'})",
         )
 
+    def test_no_instance_dict(self):
+        for node in (HTMLNode("p", "x"), LeafNode("p", "x"), ParentNode("div", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_leaf_to_html_p(self):
         node = LeafNode("p", "Hello, world!")
         self.assertEqual(node.to_html(), "<p>Hello, world!</p>")
@@ -108,6 +113,61 @@ class TestHTMLNode(unittest.TestCase):
             "<h2><b>Bold text</b>Normal text<i>italic text</i>Normal text</h2>",
         )
 
+    def test_to_html_no_children(self):
+        with self.assertRaises(ValueError):
+            ParentNode("div", None).to_html()
+
+    def test_to_html_nested_no_tag(self):
+        node = ParentNode("div", [ParentNode(None, [LeafNode("b", "x")])])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+    def test_to_html_bare_htmlnode_child(self):
+        with self.assertRaises(NotImplementedError):
+            ParentNode("div", [HTMLNode("p", "x")]).to_html()
+
+    def test_parent_props(self):
+        node = ParentNode("a", [LeafNode(None, "x")], {"href": "/", "class": "nav"})
+        self.assertEqual(node.to_html(), '<a href="/" class="nav">x</a>')
+
+    def test_deeply_nested(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span>" * 5000 + "<b>deep</b>"))
+        self.assertTrue(html.endswith("</span>" * 5000))
+
+    def test_write_html_to_file(self):
+        node = ParentNode("div", [LeafNode("p", "one"), ParentNode("ul", [LeafNode("li", "two")])])
+        sink = io.StringIO()
+        write_html(node, sink.write)
+        self.assertEqual(sink.getvalue(), node.to_html())
+        self.assertEqual(sink.getvalue(), "<div><p>one</p><ul><li>two</li></ul></div>")
+
+    def test_basepath_rewrites_root_relative_urls(self):
+        node = ParentNode("p", [
+            LeafNode("a", "home", {"href": "/blog/tom"}),
+            LeafNode("img", "", {"src": "/images/tom.png", "alt": "/not-a-url"}),
+            LeafNode("a", "ext", {"href": "https://boot.dev"}),
+        ])
+        self.assertEqual(
+            node.to_html("/site/"),
+            '<p><a href="/site/blog/tom">home</a><img src="/site/images/tom.png" alt="/not-a-url"></img>'
+            '<a href="https://boot.dev">ext</a></p>',
+        )
+
+    def test_basepath_leaves_text_alone(self):
+        node = ParentNode("pre", [LeafNode("code", 'print(\'<a href="/x">\')')])
+        self.assertEqual(
+            node.to_html("/site/"),
+            '<pre><code>print(\'<a href="/x">\')</code></pre>',
+        )
+
+    def test_default_basepath(self):
+        node = LeafNode("a", "home", {"href": "/blog"})
+        self.assertEqual(node.to_html("/"), node.to_html())
+
 
 if __name__ == "__main__":
     unittest.main()
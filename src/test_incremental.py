@@ -0,0 +1,178 @@
+import os
+import unittest
+import hashlib
+import json
+import shutil
+from unittest import mock
+from build_plan import plan_build
+from incremental import build_assets, build_changes, build_pages, load_manifest
+from tempsite import TempSiteTestCase
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestIncrementalBuild(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, "manifest.json")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+
+    def build(self, basepath="/"):
+        plan = plan_build(self.content, self.dest)
+        return build_pages(plan, self.template, basepath, self.manifest)
+
+    def test_first_build_renders_everything(self):
+        stats = self.build()
+        self.assertEqual(stats, {"rendered": 2, "skipped": 0, "deleted": 0})
+        self.assertTrue(os.path.isfile(os.path.join(self.dest, "blog", "post", "index.html")))
+        self.assertIn("blog/post/index.html", load_manifest(self.manifest)["pages"])
+
+    def test_unchanged_build_skips_everything(self):
+        self.build()
+        self.assertEqual(self.build(), {"rendered": 0, "skipped": 2, "deleted": 0})
+
+    def test_only_changed_page_is_rendered(self):
+        self.build()
+        self.write(os.path.join(self.content, "index.md"), "# Home again")
+        self.assertEqual(self.build(), {"rendered": 1, "skipped": 1, "deleted": 0})
+        with open(os.path.join(self.dest, "index.html"), encoding="utf_8") as f:
+            self.assertIn("Home again", f.read())
+
+    def test_missing_output_is_rendered(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.assertEqual(self.build()["rendered"], 1)
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.assertEqual(self.build(), {"rendered": 0, "skipped": 1, "deleted": 1})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_template_change_invalidates_everything(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.build()["rendered"], 2)
+
+    def test_basepath_change_invalidates_everything(self):
+        self.build()
+        self.assertEqual(self.build("/site/")["rendered"], 2)
+
+    def test_corrupt_manifest_forces_full_build(self):
+        self.build()
+        self.write(self.manifest, "{not json")
+        self.assertEqual(self.build()["rendered"], 2)
+
+
+class TestIncrementalAssets(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.manifest = os.path.join(root, "manifest.json")
+        os.makedirs(self.content)
+        for name in ("index.css", os.path.join("images", "a.png")):
+            self.write(os.path.join(self.static, name), name)
+
+    def sync(self):
+        return build_assets(plan_build(self.content, self.dest, [self.static]), self.manifest)
+
+    def test_unchanged_assets_are_not_copied(self):
+        self.assertEqual(self.sync(), {"copied": 2, "unchanged": 0, "deleted": 0, "bytes": 21})
+        self.assertEqual(self.sync(), {"copied": 0, "unchanged": 2, "deleted": 0, "bytes": 0})
+
+    def test_stale_assets_are_removed(self):
+        self.sync()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.sync(), {"copied": 0, "unchanged": 1, "deleted": 1, "bytes": 0})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+
+    def test_unknown_files_are_kept(self):
+        self.sync()
+        other = os.path.join(self.dest, "CNAME")
+        with open(other, "w", encoding="utf_8") as f:
+            f.write("example.com")
+        self.sync()
+        self.assertTrue(os.path.isfile(other))
+
+    def test_pages_and_assets_share_the_manifest(self):
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        template = os.path.join(self.tmp.name, "template.html")
+        self.write(template, TEMPLATE)
+        self.sync()
+        build_pages(plan_build(self.content, self.dest), template, "/", self.manifest)
+        self.sync()
+        manifest = load_manifest(self.manifest)
+        self.assertEqual(list(manifest["pages"]), ["index.html"])
+        self.assertEqual(manifest["assets"], ["images/a.png", "index.css"])
+
+
+class TestChanges(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, "manifest.json")
+        self.changes = os.path.join(root, "changes.json")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+    def build(self, wipe=False):
+        if wipe:
+            shutil.rmtree(self.dest)
+        plan = plan_build(self.content, self.dest, [self.static])
+        build_assets(plan, self.manifest)
+        build_pages(plan, self.template, "/", self.manifest, force=wipe)
+        counts = build_changes(plan, self.manifest, self.changes)
+        with open(self.changes, encoding="utf_8") as f:
+            changes = json.load(f)
+        return counts, {kind: [entry["path"] for entry in entries] for kind, entries in changes.items()}
+
+    def test_first_build_adds_everything(self):
+        counts, changes = self.build()
+        self.assertEqual(counts, {"added": 3, "modified": 0, "deleted": 0})
+        self.assertEqual(changes["added"], ["blog/index.html", "index.css", "index.html"])
+        with open(self.changes, encoding="utf_8") as f:
+            entry = json.load(f)["added"][1]
+        self.assertEqual(entry["hash"], hashlib.sha256(b"body {}").hexdigest())
+
+    def test_delta(self):
+        self.build()
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog 2")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.write(os.path.join(self.static, "a.png"), "png")
+        counts, changes = self.build()
+        self.assertEqual(changes, {"added": ["a.png"], "modified": ["blog/index.html"],
+                                   "deleted": ["index.html"]})
+
+    def test_full_rebuild_only_reports_real_changes(self):
+        self.build()
+        self.write(os.path.join(self.static, "index.css"), "body {} ")
+        counts, changes = self.build(wipe=True)
+        self.assertEqual(counts, {"added": 0, "modified": 1, "deleted": 0})
+        self.assertEqual(changes["modified"], ["index.css"])
+
+    def test_unchanged_outputs_are_not_rehashed(self):
+        self.build()
+        with mock.patch("incremental.hash_file", side_effect=AssertionError("rehashed")):
+            plan = plan_build(self.content, self.dest, [self.static])
+            counts = build_changes(plan, self.manifest, self.changes)
+        self.assertEqual(counts, {"added": 0, "modified": 0, "deleted": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+from instrument import PAGE_STAGES, BuildStats, StageTimer, write_report
+from markdown_to_html import generate_page
+
+
+class TestStageTimer(unittest.TestCase):
+    def test_laps_accumulate(self):
+        timer = StageTimer()
+        timer.lap("a")
+        timer.lap("b")
+        timer.lap("a")
+        self.assertEqual(sorted(timer.laps), ["a", "b"])
+        self.assertTrue(all(seconds >= 0 for seconds in timer.laps.values()))
+
+
+class TestBuildStats(unittest.TestCase):
+    def test_stage(self):
+        stats = BuildStats()
+        with stats.stage("copy"):
+            pass
+        with stats.stage("copy"):
+            pass
+        self.assertIn("copy", stats.stages)
+
+    def test_slowest_pages(self):
+        stats = BuildStats()
+        stats.add_page("a.md", {"read": 0.1, "parse": 0.1})
+        stats.add_page("b.md", {"read": 0.5, "parse": 0.0})
+        stats.add_page("c.md", {"read": 0.0, "parse": 0.05})
+        self.assertEqual([page for page, _ in stats.slowest_pages(2)], ["b.md", "a.md"])
+        self.assertAlmostEqual(stats.page_stages["read"], 0.6)
+        summary = stats.summary(slowest=1)
+        self.assertIn("built 3 page(s)", summary)
+        self.assertIn("b.md", summary)
+        self.assertNotIn("c.md", summary)
+
+    def test_counters(self):
+        stats = BuildStats()
+        stats.count("pages skipped", 2)
+        stats.count("pages skipped")
+        self.assertEqual(stats.counters, {"pages skipped": 3})
+
+    def test_write_report(self):
+        stats = BuildStats()
+        stats.add_page("a.md", {"read": 0.1})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "report.json")
+            write_report(path, stats)
+            with open(path, encoding="utf_8") as f:
+                report = json.load(f)
+        self.assertEqual(report["slowest_pages"], [["a.md", 0.1]])
+
+
+class TestGeneratePageTimings(unittest.TestCase):
+    def test_returns_stage_timings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = os.path.join(tmp, "index.md")
+            template = os.path.join(tmp, "template.html")
+            with open(src, "w", encoding="utf_8") as f:
+                f.write("# Title\n\ntext")
+            with open(template, "w", encoding="utf_8") as f:
+                f.write("{{ Title }}{{ Content }}")
+            timings = generate_page(src, template, os.path.join(tmp, "out", "index.html"), "/")
+        self.assertEqual(tuple(timings), PAGE_STAGES)
+
+
+if __name__ == "__main__":
+    unittest.main()
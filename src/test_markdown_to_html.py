@@ -1,6 +1,10 @@
+import os
+import tempfile
 import unittest
+from unittest import mock
 from markdown_to_html import *
 from htmlnode import BlockType
+from tempsite import TempSiteTestCase
 
 
 class TestMarkdownToBlocks(unittest.TestCase):
@@ -222,4 +226,227 @@ class TestExtractTitle(unittest.TestCase):
     def test_h1_with_special_characters(self):
         print('ok ok')
         md = '# Hello, World! @2025'
-        self.assertEqual(extract_title(md), 'Hello, World! @2025')
\ No newline at end of file
+        self.assertEqual(extract_title(md), 'Hello, World! @2025')
+
+class TestIterBlocks(unittest.TestCase):
+    def test_same_blocks_as_markdown_to_blocks(self):
+        md = "# Title\n\npara\nline\n   \n```\ncode\n\n  more\n```\n## Sub\n- a\n- b\n"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, "w", encoding="utf_8") as f:
+                f.write(md)
+            with open(path, encoding="utf_8") as f:
+                blocks = list(iter_blocks(f))
+        self.assertEqual([block.text for block in blocks], markdown_to_blocks(md))
+        for block in blocks:
+            self.assertEqual(block.block_type, block_to_block_type(block.text))
+            self.assertEqual(block.lines, block.text.split("\n"))
+
+    def test_unterminated_code_block(self):
+        block, = iter_blocks(["  ```\n", "code\n", "\n", "   \n"])
+        self.assertEqual(block, Block("```\ncode", BlockType.PARAGRAPH, ["```", "code"]))
+        self.assertEqual(block_to_block_type(block.text), BlockType.PARAGRAPH)
+
+    def test_indented_closing_fence(self):
+        block, = iter_blocks(["```\n", "code\n", "  ```\n"])
+        self.assertEqual(block.lines, ["```", "code", "  ```"])
+        self.assertEqual(block.block_type, block_to_block_type(block.text))
+
+    def test_is_lazy(self):
+        lines = iter(["first\n", "\n", "second\n"])
+        blocks = iter_blocks(lines)
+        self.assertEqual(next(blocks).text, "first")
+        self.assertEqual(next(lines), "second\n")
+
+    def test_document_from_lines(self):
+        md = "# Title\n\nSome **text**\n"
+        doc = Document.from_lines(md.splitlines(keepends=True))
+        self.assertEqual(doc.blocks, Document(md).blocks)
+        self.assertEqual(doc.title, "Title")
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_front_matter(self):
+        doc = Document("---\ndate: 2024-03-01\n\ntags: a, b\nurl: http://x\n---\n# Title\n\nbody")
+        self.assertEqual(doc.metadata, {"date": "2024-03-01", "tags": "a, b", "url": "http://x"})
+        self.assertEqual(doc.title, "Title")
+        self.assertEqual(doc.html_node.to_html(), "<div><h1>Title</h1><p>body</p></div>")
+
+    def test_from_lines(self):
+        lines = ["---\n", "date: 2024\n", "---\n", "# Title\n"]
+        doc = Document.from_lines(lines)
+        self.assertEqual(doc.metadata, {"date": "2024"})
+        self.assertEqual([block.text for block in doc.blocks], ["# Title"])
+
+    def test_not_front_matter(self):
+        for md in ("# Title\n---\na: b\n---", "---\nnot a key\n---\n# T", "---\na: b\n# T"):
+            doc = Document(md)
+            self.assertEqual(doc.metadata, {})
+            self.assertEqual(doc.blocks, Document.from_lines(md.split("\n")).blocks)
+            self.assertEqual([block.text for block in doc.blocks], markdown_to_blocks(md))
+
+    def test_empty(self):
+        self.assertEqual(Document("").metadata, {})
+        self.assertEqual(split_front_matter(["---", "---", "x"])[0], {})
+        self.assertEqual(list(split_front_matter(["---", "---", "x"])[1]), ["x"])
+
+
+class TestDocument(unittest.TestCase):
+    def test_blocks_are_classified_once(self):
+        doc = Document("# Title\n\nSome **text**\n\n- a\n- b")
+        self.assertEqual(
+            doc.blocks,
+            [
+                Block("# Title", BlockType.HEADING, ["# Title"]),
+                Block("Some **text**", BlockType.PARAGRAPH, ["Some **text**"]),
+                Block("- a\n- b", BlockType.UNORDERED_LIST, ["- a", "- b"]),
+            ],
+        )
+
+    def test_title_and_html(self):
+        md = "## Intro\n\n# Real Title\n\nbody"
+        doc = Document(md)
+        self.assertEqual(doc.title, extract_title(md))
+        self.assertEqual(doc.html_node.to_html(), markdown_to_html_node(md).to_html())
+
+    def test_html_node_is_built_once(self):
+        doc = Document("# Title")
+        self.assertIs(doc.html_node, doc.html_node)
+
+    def test_no_title(self):
+        doc = Document("just text")
+        with self.assertRaises(Exception):
+            doc.title
+        self.assertEqual(doc.html_node.to_html(), "<div><p>just text</p></div>")
+
+
+class TestRenderLines(unittest.TestCase):
+    MD = "---\nlayout: post\n---\n## Intro\n\n# Title\n\n[home](/blog)\n\n```\ncode\n```\n\n- a\n- b"
+
+    def test_matches_document(self):
+        doc = Document(self.MD)
+        for cache in (None, BlockCache(), BlockCache(max_size=0)):
+            self.assertEqual(render_lines(self.MD.split("\n"), "/site/", cache),
+                             (doc.metadata, doc.title, doc.html_node.to_html("/site/")))
+        self.assertEqual(render_lines(["# T"]), ({}, "T", "<div><h1>T</h1></div>"))
+
+    def test_no_title(self):
+        with self.assertRaises(Exception):
+            render_lines(["just text"])
+
+    def test_blocks_are_rendered_as_they_are_read(self):
+        read = []
+
+        def lines():
+            for i in range(100):
+                read.append(i)
+                yield f"# Block {i}" if i == 0 else f"paragraph {i}"
+                yield ""
+
+        rendered_after = []
+        original = block_to_html_node
+
+        def render(*args):
+            rendered_after.append(len(read))
+            return original(*args)
+
+        with mock.patch("markdown_to_html.block_to_html_node", side_effect=render):
+            render_lines(lines())
+        # every block is rendered before the next one is read
+        self.assertEqual(rendered_after, list(range(1, 101)))
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_matches_html_node(self):
+        md = "# Title\n\n[home](/blog) text\n\n```\ncode\n```\n\n- a\n- b\n\n> q"
+        cache = BlockCache()
+        doc = Document(md)
+        self.assertEqual(doc.to_html("/site/", cache), doc.html_node.to_html("/site/"))
+        self.assertEqual((cache.hits, cache.misses), (0, 5))
+        self.assertEqual(Document(md).to_html("/site/", cache), doc.html_node.to_html("/site/"))
+        self.assertEqual((cache.hits, cache.misses), (5, 5))
+        # the basepath is part of the key
+        self.assertEqual(doc.to_html("/", cache), doc.html_node.to_html("/"))
+        self.assertEqual(cache.misses, 10)
+
+    def test_lru_eviction(self):
+        cache = BlockCache(max_size=2)
+        a, b, c = (Document(text).blocks[0] for text in ("a", "b", "c"))
+        cache.render(a)
+        cache.render(b)
+        cache.render(a)
+        cache.render(c)  # evicts b, the least recently used
+        self.assertEqual(len(cache), 2)
+        cache.render(a)
+        cache.render(b)
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+        cache.resize(1)
+        self.assertEqual(len(cache), 1)
+
+    def test_disabled(self):
+        cache = BlockCache(max_size=0)
+        doc = Document("text\n\ntext")
+        self.assertEqual(doc.to_html(None, cache), "<div><p>text</p><p>text</p></div>")
+        self.assertEqual(len(cache), 0)
+
+
+class TestWriteIfChanged(unittest.TestCase):
+    def test_skips_identical_content(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.html")
+            self.assertTrue(write_if_changed(path, "<p>é</p>"))
+            os.utime(path, ns=(1, 1))
+            self.assertFalse(write_if_changed(path, "<p>é</p>"))
+            self.assertEqual(os.stat(path).st_mtime_ns, 1)
+            # same size, different bytes
+            self.assertTrue(write_if_changed(path, "<p>e!</p>"))
+            with open(path, encoding="utf_8") as f:
+                self.assertEqual(f.read(), "<p>e!</p>")
+            self.assertEqual(os.listdir(tmp), ["index.html"])
+
+    def test_failed_write_keeps_old_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "index.html")
+            write_if_changed(path, "old")
+            with mock.patch("os.replace", side_effect=OSError("disk full")):
+                with self.assertRaises(OSError):
+                    write_if_changed(path, "new")
+            with open(path, encoding="utf_8") as f:
+                self.assertEqual(f.read(), "old")
+            self.assertEqual(os.listdir(tmp), ["index.html"])
+
+
+class TestGeneratePage(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.tmp.name, "index.md")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.dest = os.path.join(self.tmp.name, "out", "index.html")
+        self.write(self.template, '<link href="/index.css" /><title>{{ Title }}</title>{{ Content }}')
+
+    def test_front_matter_placeholders(self):
+        self.write(self.template, "<title>{{ Title }}</title><time>{{ date }}</time>{{ missing }}{{ Content }}")
+        self.write(self.src, "---\ndate: 2024-03-01\nTitle: ignored\n---\n# Title")
+        generate_page(self.src, self.template, self.dest, "/")
+        self.assertEqual(self.read(self.dest), "<title>Title</title><time>2024-03-01</time>{{ missing }}"
+                                               "<div><h1>Title</h1></div>")
+
+    def test_basepath_only_touches_attributes(self):
+        self.write(self.src, '# Title\n\n[home](/blog) ![pic](/images/a.png)\n\n```\n<a href="/raw">\n```')
+        generate_page(self.src, self.template, self.dest, "/site/")
+        html = self.read(self.dest)
+        self.assertIn('<link href="/site/index.css" />', html)
+        self.assertIn('<a href="/site/blog">home</a>', html)
+        self.assertIn('<img src="/site/images/a.png" alt="pic"></img>', html)
+        self.assertIn('<pre><code><a href="/raw">\n</code></pre>', html)
+
+    def test_generate_pages_recursive(self):
+        content = os.path.join(self.tmp.name, "content")
+        self.write(os.path.join(content, "index.md"), "# Home")
+        self.write(os.path.join(content, "blog", "post.md"), "# Post")
+        self.write(os.path.join(content, "blog", "pic.png"), "png")
+        out = os.path.join(self.tmp.name, "site")
+        generate_pages_recursive(content, self.template, out, "/")
+        self.assertIn("<title>Post</title>", self.read(os.path.join(out, "blog", "post.html")))
+        self.assertEqual(sorted(os.listdir(os.path.join(out, "blog"))), ["post.html"])
+        self.assertTrue(os.path.isfile(os.path.join(out, "index.html")))
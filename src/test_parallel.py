@@ -0,0 +1,80 @@
+import os
+import unittest
+from instrument import BuildStats
+from markdown_to_html import BLOCK_CACHE_SIZE, set_block_cache_size
+from parallel import BuildError, render_pages
+from build_plan import plan_build
+from incremental import build_pages, load_manifest
+from tempsite import TempSiteTestCase
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestRenderPages(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.pages = []
+        for i in range(6):
+            src = os.path.join(self.content, f"p{i}", "index.md")
+            self.write(src, f"# Page {i}\n\nbody **{i}**")
+            self.pages.append((src, os.path.join(self.dest, f"p{i}", "index.html")))
+
+    def test_parallel_matches_serial(self):
+        self.assertEqual(render_pages(self.pages, self.template, "/", jobs=1), [])
+        serial = [self.read(dest) for _, dest in self.pages]
+        for _, dest in self.pages:
+            os.remove(dest)
+        self.assertEqual(render_pages(self.pages, self.template, "/", jobs=3), [])
+        self.assertEqual([self.read(dest) for _, dest in self.pages], serial)
+
+    def test_block_cache_counters(self):
+        for src, _ in self.pages:
+            self.write(src, self.read(src) + "\n\nshared footer")
+        set_block_cache_size(0)  # start empty
+        set_block_cache_size(BLOCK_CACHE_SIZE)
+        stats = BuildStats()
+        self.assertEqual(render_pages(self.pages, self.template, "/", stats=stats), [])
+        self.assertEqual(stats.counters["block cache hits"], 5)
+        self.assertEqual(stats.counters["block cache misses"], 13)
+        self.assertIn("<p>shared footer</p>", self.read(self.pages[5][1]))
+
+        stats = BuildStats()
+        self.assertEqual(render_pages(self.pages, self.template, "/", jobs=2, stats=stats), [])
+        self.assertEqual(stats.counters["block cache hits"] + stats.counters["block cache misses"], 18)
+
+    def test_parallel_pages_share_new_directories(self):
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        for d in range(16):
+            for name in ("a", "b", "c"):
+                self.write(os.path.join(self.content, f"d{d}", f"{name}.md"), f"# {d} {name}")
+        counts = build_pages(plan_build(self.content, self.dest), self.template, "/", manifest, jobs=8)
+        self.assertEqual(counts["rendered"], 6 + 48)
+
+    def test_errors_are_collected(self):
+        self.write(self.pages[1][0], "no title here")
+        self.write(self.pages[4][0], "**unbalanced")
+        failures = render_pages(self.pages, self.template, "/", jobs=2)
+        self.assertEqual([src for src, _ in failures], [self.pages[1][0], self.pages[4][0]])
+        # the good pages were still written
+        self.assertTrue(os.path.isfile(self.pages[5][1]))
+
+    def test_failed_pages_are_retried(self):
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+        self.write(self.pages[2][0], "no title here")
+        with self.assertRaises(BuildError) as cm:
+            build_pages(plan_build(self.content, self.dest), self.template, "/", manifest, jobs=2)
+        self.assertEqual(len(cm.exception.failures), 1)
+        self.assertNotIn("p2/index.html", load_manifest(manifest)["pages"])
+        self.write(self.pages[2][0], "# fixed")
+        stats = build_pages(plan_build(self.content, self.dest), self.template, "/", manifest)
+        self.assertEqual(stats["rendered"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import unittest
+import render_cache
+from markdown_to_html import generate_page, set_render_cache
+from render_cache import RenderCache
+from tempsite import TempSiteTestCase
+
+
+class TestRenderCache(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.cache = RenderCache(os.path.join(root, "cache"))
+        self.src = os.path.join(root, "index.md")
+        self.template = os.path.join(root, "template.html")
+        self.dest = os.path.join(root, "out", "index.html")
+        self.write(self.src, "# Title\n\n[home](/blog)")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        set_render_cache(None)
+        super().tearDown()
+
+    def test_key(self):
+        key = self.cache.key(self.src, "/")
+        self.assertEqual(self.cache.key(self.src, "/"), key)
+        self.assertNotEqual(self.cache.key(self.src, "/site/"), key)
+        self.write(self.src, "# Other")
+        self.assertNotEqual(self.cache.key(self.src, "/"), key)
+
+    def test_renderer_version_is_part_of_the_key(self):
+        key = self.cache.key(self.src, "/")
+        version = render_cache.RENDERER_VERSION
+        render_cache.RENDERER_VERSION = version + 1
+        try:
+            self.assertNotEqual(self.cache.key(self.src, "/"), key)
+        finally:
+            render_cache.RENDERER_VERSION = version
+
+    def test_get_put(self):
+        self.assertIsNone(self.cache.get("ab" * 32))
+        self.cache.put("ab" * 32, "Title", "<div></div>", {"date": "2024-01-02"})
+        self.assertEqual(self.cache.get("ab" * 32), ("Title", "<div></div>", {"date": "2024-01-02"}))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        # no temp files are left behind
+        self.assertEqual(os.listdir(os.path.dirname(self.cache.path("ab" * 32))), ["ab" * 32 + ".json"])
+
+    def test_corrupt_entry_is_a_miss(self):
+        path = self.cache.path("cd" * 32)
+        os.makedirs(os.path.dirname(path))
+        self.write(path, '{"title": "trunc')
+        self.assertIsNone(self.cache.get("cd" * 32))
+
+    def test_evict_least_recently_used(self):
+        keys = [f"{i:02d}" * 32 for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "T", "x" * 100)
+            os.utime(self.cache.path(key), ns=(i, i))
+        self.cache.get(keys[0])  # now the most recently used
+        size = os.path.getsize(self.cache.path(keys[0]))
+        self.cache.max_bytes = 2 * size
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+    def test_template_change_rewraps_cached_body(self):
+        set_render_cache(self.cache)
+        generate_page(self.src, self.template, self.dest, "/")
+        self.assertEqual(self.cache.misses, 1)
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        os.utime(self.template, ns=(1, 1))
+        generate_page(self.src, self.template, self.dest, "/")
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.read(self.dest), '<h1>Title</h1><div><h1>Title</h1><p><a href="/blog">home</a></p></div>')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import shutil
+import unittest
+from build_plan import plan_build
+from incremental import load_manifest
+from parallel import BuildError
+from shard import SHARD_MANIFEST, build_shard, merge_shards, parse_shard, shard_of
+from tempsite import TempSiteTestCase
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestShardOf(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ("0/4", "5/4", "2", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_stable_partition(self):
+        paths = [f"blog/post{i}/index.md" for i in range(200)]
+        shards = [shard_of(path, 4) for path in paths]
+        self.assertEqual(shards, [shard_of(path, 4) for path in paths])
+        self.assertEqual(set(shards), {1, 2, 3, 4})
+        self.assertEqual(shard_of("index.md", 1), 1)
+
+
+class TestShardedBuild(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, "manifest.json")
+        self.docs = os.path.join(root, "docs")
+        self.write(self.template, TEMPLATE)
+        for i in range(12):
+            self.write(os.path.join(self.content, f"p{i}", "index.md"), f"# Page {i}")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+    def shard_dir(self, index):
+        return os.path.join(self.tmp.name, f"shard{index}")
+
+    def build_shards(self, shards=3):
+        rendered = 0
+        for index in range(1, shards + 1):
+            plan = plan_build(self.content, self.shard_dir(index), [self.static])
+            rendered += build_shard(plan, self.template, "/", (index, shards))["rendered"]
+        return rendered
+
+    def merge(self, shard_dirs):
+        plan = plan_build(self.content, self.docs, [self.static])
+        return merge_shards(plan, shard_dirs, self.manifest)
+
+    def test_shards_cover_every_page_once(self):
+        self.assertEqual(self.build_shards(), 12)
+        self.assertFalse(os.path.exists(os.path.join(self.shard_dir(1), "index.css")))
+        self.assertTrue(os.path.isfile(os.path.join(self.shard_dir(1), SHARD_MANIFEST)))
+
+    def test_parallel_shard_shares_new_directories(self):
+        # several pages per directory, so workers create the same directories
+        for d in range(16):
+            for name in ("a", "b", "c"):
+                self.write(os.path.join(self.content, f"d{d}", f"{name}.md"), f"# {d} {name}")
+        for _ in range(3):
+            shutil.rmtree(self.shard_dir(1), ignore_errors=True)
+            plan = plan_build(self.content, self.shard_dir(1), [self.static])
+            counts = build_shard(plan, self.template, "/", (1, 1), jobs=8)
+            self.assertEqual(counts["rendered"], 12 + 48)
+
+    def test_merge(self):
+        self.build_shards()
+        counts = self.merge([self.shard_dir(i) for i in (1, 2, 3)])
+        self.assertEqual(counts["merged"], 12)
+        self.assertEqual(counts["copied"], 1)
+        self.assertEqual(sorted(os.listdir(self.docs)), sorted(["index.css"] + [f"p{i}" for i in range(12)]))
+        with open(os.path.join(self.docs, "p7", "index.html"), encoding="utf_8") as f:
+            self.assertEqual(f.read(), "<title>Page 7</title><body><div><h1>Page 7</h1></div></body>")
+        self.assertEqual(len(load_manifest(self.manifest)["pages"]), 12)
+
+    def test_merge_removes_stale_outputs(self):
+        self.build_shards()
+        self.write(os.path.join(self.docs, "stray", "index.html"), "left behind")
+        counts = self.merge([self.shard_dir(i) for i in (1, 2, 3)])
+        self.assertEqual(counts["stale removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "stray")))
+
+    def test_missing_shard(self):
+        self.build_shards()
+        with self.assertRaises(BuildError) as cm:
+            self.merge([self.shard_dir(1), self.shard_dir(3)])
+        problems = dict(cm.exception.failures)
+        self.assertIn("not exactly 1..3", problems[f"{self.shard_dir(1)}, {self.shard_dir(3)}"])
+        self.assertTrue(any(error == "not rendered by any shard" for error in problems.values()))
+        self.assertFalse(os.path.exists(self.docs))
+
+    def test_collision(self):
+        self.build_shards(shards=2)
+        other = os.path.join(self.tmp.name, "other")
+        shutil.copytree(self.shard_dir(1), other)
+        with self.assertRaises(BuildError) as cm:
+            self.merge([self.shard_dir(1), self.shard_dir(2), other])
+        errors = [error for _, error in cm.exception.failures]
+        self.assertTrue(any(error.startswith("rendered by both") for error in errors))
+
+    def test_merge_leaves_unchanged_pages_alone(self):
+        self.build_shards()
+        shard_dirs = [self.shard_dir(i) for i in (1, 2, 3)]
+        self.merge(shard_dirs)
+        page = os.path.join(self.docs, "p7", "index.html")
+        os.utime(page, ns=(1, 1))
+        self.merge(shard_dirs)
+        self.assertEqual(os.stat(page).st_mtime_ns, 1)
+
+    def test_source_changed_after_render(self):
+        self.build_shards()
+        self.write(os.path.join(self.content, "p3", "index.md"), "# Page 3, edited")
+        with self.assertRaises(BuildError) as cm:
+            self.merge([self.shard_dir(i) for i in (1, 2, 3)])
+        [(rel_dest, error)] = cm.exception.failures
+        self.assertEqual(rel_dest, os.path.join("p3", "index.html"))
+        self.assertIn("another version of the markdown", error)
+        self.assertFalse(os.path.exists(self.docs))
+
+    def test_removed_page(self):
+        self.build_shards()
+        shutil.rmtree(os.path.join(self.content, "p3"))
+        with self.assertRaises(BuildError) as cm:
+            self.merge([self.shard_dir(i) for i in (1, 2, 3)])
+        self.assertEqual(cm.exception.failures,
+                         [(os.path.join("p3", "index.html"), "rendered by a shard but not in the content")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import os
+import unittest
+from unittest import mock
+from build_plan import plan_build
+from markdown_to_html import Document
+from site_index import SiteIndex, block_words, page_date, page_tags
+from tempsite import TempSiteTestCase
+
+
+class TestSiteIndex(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.db = os.path.join(self.tmp.name, "index.db")
+        self.write("index.md", "# Home\n\nwelcome to the site")
+        self.write("blog/old/index.md", "---\ndate: 2023-05-01\ntags: python, tolkien\n---\n# Old\n\none two")
+        self.write("blog/new/index.md", "---\ndate: 2024-02-01\ntags: [tolkien]\n---\n# New\n\nthree")
+
+    def write(self, rel, text):
+        super().write(os.path.join(self.content, rel), text)
+
+    def update(self):
+        with SiteIndex(self.db) as index:
+            return index.update(plan_build(self.content, os.path.join(self.tmp.name, "docs")))
+
+    def test_page_tags(self):
+        self.assertEqual(page_tags({"tags": "a, b,a"}), ["a", "b"])
+        self.assertEqual(page_tags({"tags": "[a, b]"}), ["a", "b"])
+        self.assertEqual(page_tags({}), [])
+
+    def test_block_words(self):
+        md = ("# Two words\n\n- one\n- **two** words\n\n1. first\n2. second\n\n> quoted text\n\n"
+              "```\nprint(x)\n```\n\n[a link](http://example.com/very/long) and ![pic](/a.png)")
+        self.assertEqual([block_words(block) for block in Document(md).blocks], [2, 3, 2, 2, 1, 4])
+        self.assertEqual(block_words(Document("**unbalanced text").blocks[0]), 2)
+
+    def test_page_date(self):
+        self.assertEqual(page_date("2024-03-01"), "2024-03-01")
+        self.assertEqual(page_date("2024-03-01 10:30"), "2024-03-01T10:30:00")
+        self.assertIsNone(page_date("March 1, 2024"))
+        self.assertIsNone(page_date("01/03/2024"))
+        self.assertIsNone(page_date(None))
+
+    def test_non_iso_date_is_undated(self):
+        self.write("blog/odd/index.md", "---\ndate: 12/31/2030\n---\n# Odd")
+        with self.assertLogs("static_site_gen", "WARNING"):
+            self.update()
+        with SiteIndex(self.db) as index:
+            self.assertEqual([page["title"] for page in index.recent()], ["New", "Old", "Odd", "Home"])
+            self.assertEqual(index.page("blog/odd/index.md")["metadata"]["date"], "12/31/2030")
+
+    def test_queries(self):
+        self.assertEqual(self.update(), {"indexed": 3, "unchanged": 0, "removed": 0})
+        with SiteIndex(self.db) as index:
+            self.assertEqual([page["title"] for page in index.recent()], ["New", "Old", "Home"])
+            self.assertEqual([page["source"] for page in index.tagged("tolkien")],
+                             ["blog/new/index.md", "blog/old/index.md"])
+            self.assertEqual(index.tags(), [("tolkien", 2), ("python", 1)])
+            page = index.page("blog/old/index.md")
+            self.assertEqual(page["path"], "blog/old/index.html")
+            self.assertEqual(page["date"], "2023-05-01")
+            self.assertEqual(page["tags"], ["python", "tolkien"])
+            self.assertEqual(page["words"], 3)
+            self.assertEqual(index.recent(limit=1, tag="python")[0]["title"], "Old")
+
+    def test_incremental_update(self):
+        self.update()
+        with mock.patch("site_index.hash_file", side_effect=AssertionError("read")):
+            self.assertEqual(self.update(), {"indexed": 0, "unchanged": 3, "removed": 0})
+
+        # touched but identical: hashed, not parsed
+        os.utime(os.path.join(self.content, "index.md"), ns=(1, 1))
+        with mock.patch("site_index.iter_blocks", side_effect=AssertionError("parsed")):
+            self.assertEqual(self.update(), {"indexed": 0, "unchanged": 3, "removed": 0})
+
+        self.write("blog/old/index.md", "---\ndate: 2025-01-01\ntags: rust\n---\n# Old")
+        os.remove(os.path.join(self.content, "blog", "new", "index.md"))
+        self.assertEqual(self.update(), {"indexed": 1, "unchanged": 1, "removed": 1})
+        with SiteIndex(self.db) as index:
+            self.assertEqual(index.tags(), [("rust", 1)])
+            self.assertEqual(index.recent()[0]["date"], "2025-01-01")
+            self.assertIsNone(index.page("blog/new/index.md"))
+
+    def test_page_without_title(self):
+        self.write("notes/index.md", "just notes")
+        self.update()
+        with SiteIndex(self.db) as index:
+            self.assertIsNone(index.page("notes/index.md")["title"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+import unittest
+
+SRC = os.path.dirname(os.path.abspath(__file__))
+
+# only imported by the optional features that need them (--jobs, --profile,
+# --serve, --watch, --shard/--merge, --cache-dir, --index)
+LAZY_MODULES = (
+    "pydoc", "pstats", "cProfile", "concurrent.futures", "multiprocessing",
+    "http.server", "sqlite3", "tempfile",
+    "watch", "devserver", "shard", "render_cache", "site_index",
+)
+
+# cumulative microseconds `import main` may take (best of a few runs)
+IMPORT_BUDGET_US = 100_000
+
+
+def import_times(module):
+    # {module: cumulative microseconds} from python -X importtime
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_optional_modules_are_lazy(self):
+        loaded = import_times("main")
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, loaded)
+
+    def test_import_budget(self):
+        best = min(import_times("main")["main"] for _ in range(3))
+        self.assertLess(best, IMPORT_BUDGET_US)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import time
+import unittest
+from unittest import mock
+from static_to_public import PUBLISH_STRATEGIES, copy_from_to, publish_file, sync_from_to
+from tempsite import TempSiteTestCase
+
+
+class TestStaticToPublic(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png")
+        self.write(os.path.join(self.src, "notes.md"), "# not copied")
+
+    def test_copy_from_to(self):
+        copy_from_to(self.src, self.dest)
+        self.assertEqual(self.read(os.path.join(self.dest, "images", "a.png")), "png")
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "notes.md")))
+
+    def test_copy_from_to_existing_dest(self):
+        copy_from_to(self.src, self.dest)
+        copy_from_to(self.src, self.dest)
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body {}")
+
+    def test_sync_copies_then_skips(self):
+        first = sync_from_to(self.src, self.dest)
+        self.assertEqual(first, {"index.css": True, os.path.join("images", "a.png"): True})
+        src_stat = os.stat(os.path.join(self.src, "index.css"))
+        dest_stat = os.stat(os.path.join(self.dest, "index.css"))
+        self.assertEqual(src_stat.st_mtime_ns, dest_stat.st_mtime_ns)
+        second = sync_from_to(self.src, self.dest)
+        self.assertEqual(set(second.values()), {False})
+
+    def test_sync_copies_changed_file(self):
+        sync_from_to(self.src, self.dest)
+        path = os.path.join(self.src, "index.css")
+        self.write(path, "body { margin: 0 }")
+        result = sync_from_to(self.src, self.dest)
+        self.assertTrue(result["index.css"])
+        self.assertFalse(result[os.path.join("images", "a.png")])
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body { margin: 0 }")
+
+    def test_sync_same_size_new_mtime(self):
+        sync_from_to(self.src, self.dest)
+        path = os.path.join(self.src, "index.css")
+        self.write(path, "body []")
+        future = time.time() + 10
+        os.utime(path, (future, future))
+        self.assertTrue(sync_from_to(self.src, self.dest)["index.css"])
+        self.assertEqual(self.read(os.path.join(self.dest, "index.css")), "body []")
+
+    def test_sync_checksum_ignores_mtime(self):
+        sync_from_to(self.src, self.dest)
+        future = time.time() + 10
+        os.utime(os.path.join(self.src, "index.css"), (future, future))
+        self.assertFalse(sync_from_to(self.src, self.dest, checksum=True)["index.css"])
+
+
+class TestPublishFile(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.src = os.path.join(self.tmp.name, "src.bin")
+        self.dest = os.path.join(self.tmp.name, "dest.bin")
+        with open(self.src, "wb") as f:
+            f.write(b"asset bytes")
+
+    def read(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_every_strategy_publishes_the_content(self):
+        for strategy in PUBLISH_STRATEGIES:
+            publish_file(self.src, self.dest, strategy)
+            self.assertEqual(self.read(self.dest), b"asset bytes", strategy)
+
+    def test_hardlink_shares_the_inode(self):
+        self.assertEqual(publish_file(self.src, self.dest, "hardlink"), "hardlink")
+        self.assertTrue(os.path.samefile(self.src, self.dest))
+
+    def test_republishing_never_writes_into_the_source(self):
+        publish_file(self.src, self.dest, "hardlink")
+        other = os.path.join(self.tmp.name, "other.bin")
+        with open(other, "wb") as f:
+            f.write(b"other")
+        publish_file(other, self.dest, "copy")
+        self.assertEqual(self.read(self.src), b"asset bytes")
+        self.assertEqual(self.read(self.dest), b"other")
+
+    def test_falls_back_to_copy(self):
+        with mock.patch("os.link", side_effect=OSError("cross-device link")):
+            self.assertEqual(publish_file(self.src, self.dest, "hardlink"), "copy")
+        self.assertEqual(self.read(self.dest), b"asset bytes")
+        self.assertFalse(os.path.samefile(self.src, self.dest))
+
+    def test_reflink_keeps_mtime(self):
+        os.utime(self.src, (1000000000, 1000000000))
+        publish_file(self.src, self.dest, "reflink")
+        self.assertEqual(os.stat(self.dest).st_mtime, 1000000000)
+
+    def test_synced_hardlinks_are_unchanged(self):
+        src_dir = os.path.join(self.tmp.name, "static")
+        os.mkdir(src_dir)
+        os.replace(self.src, os.path.join(src_dir, "a.bin"))
+        dest_dir = os.path.join(self.tmp.name, "docs")
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="hardlink"), {"a.bin": True})
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="hardlink"), {"a.bin": False})
+
+    def test_switching_strategy_republishes(self):
+        src_dir = os.path.join(self.tmp.name, "static")
+        os.mkdir(src_dir)
+        src = os.path.join(src_dir, "a.bin")
+        os.replace(self.src, src)
+        dest_dir = os.path.join(self.tmp.name, "docs")
+        dest = os.path.join(dest_dir, "a.bin")
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="symlink"), {"a.bin": True})
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="symlink"), {"a.bin": False})
+        self.assertTrue(os.path.islink(dest))
+
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="copy"), {"a.bin": True})
+        self.assertFalse(os.path.islink(dest))
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="copy"), {"a.bin": False})
+
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="hardlink"), {"a.bin": True})
+        self.assertTrue(os.path.samefile(src, dest))
+        self.assertEqual(os.stat(src).st_nlink, 2)
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="hardlink"), {"a.bin": False})
+
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="copy"), {"a.bin": True})
+        self.assertFalse(os.path.samefile(src, dest))
+        self.assertEqual(self.read(dest), b"asset bytes")
+
+        self.assertEqual(sync_from_to(src_dir, dest_dir, strategy="symlink"), {"a.bin": True})
+        self.assertTrue(os.path.islink(dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import io
+import os
+import tempfile
+import unittest
+from template import Template, layout_path, layout_paths, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<p>x</p>"}),
+            "<title>Hi</title><article><p>x</p></article>",
+        )
+
+    def test_compiled_segments(self):
+        template = Template("a{{ One }}b{{Two}}c")
+        self.assertEqual(template.segments, ["a", "b", "c"])
+        self.assertEqual([name for name, _ in template.slots], ["One", "Two"])
+
+    def test_arbitrary_and_repeated_placeholders(self):
+        template = Template("{{ Title }} by {{ Author }} - {{ Title }}")
+        self.assertEqual(
+            template.render({"Title": "Post", "Author": "Me"}),
+            "Post by Me - Post",
+        )
+
+    def test_missing_value_is_left_alone(self):
+        template = Template("<p>{{ Title }}</p><p>{{ Unknown }}</p>")
+        self.assertEqual(template.render({"Title": "T"}), "<p>T</p><p>{{ Unknown }}</p>")
+
+    def test_no_placeholders(self):
+        self.assertEqual(Template("plain").render({"Title": "x"}), "plain")
+
+    def test_values_are_not_reexpanded(self):
+        template = Template("{{ Title }}|{{ Content }}")
+        self.assertEqual(
+            template.render({"Title": "{{ Content }}", "Content": "c"}),
+            "{{ Content }}|c",
+        )
+
+    def test_with_basepath(self):
+        template = Template('<link href="/index.css" /><img src="/logo.png">{{ Content }}')
+        rebased = template.with_basepath("/site/")
+        self.assertEqual(
+            rebased.render({"Content": '<a href="/x">'}),
+            '<link href="/site/index.css" /><img src="/site/logo.png"><a href="/x">',
+        )
+        self.assertIs(template.with_basepath("/site/"), rebased)
+        self.assertIs(template.with_basepath("/"), template)
+
+    def test_write(self):
+        template = Template("<h1>{{ Title }}</h1>")
+        sink = io.StringIO()
+        template.write(sink.write, {"Title": "T"})
+        self.assertEqual(sink.getvalue(), "<h1>T</h1>")
+
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "template.html")
+        with open(self.path, "w", encoding="utf_8") as f:
+            f.write("<h1>{{ Title }}</h1>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cached_by_path(self):
+        self.assertIs(load_template(self.path), load_template(self.path))
+
+    def test_reloaded_when_mtime_changes(self):
+        first = load_template(self.path)
+        with open(self.path, "w", encoding="utf_8") as f:
+            f.write("<h2>{{ Title }}</h2>")
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        second = load_template(self.path)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.render({"Title": "T"}), "<h2>T</h2>")
+
+    def test_layouts(self):
+        layouts = os.path.join(self.tmp.name, "layouts")
+        os.mkdir(layouts)
+        other = os.path.join(layouts, "post.html")
+        with open(other, "w", encoding="utf_8") as f:
+            f.write("<article>{{ Content }}</article>")
+        self.assertEqual(layout_path(self.path), self.path)
+        self.assertEqual(layout_path(self.path, "post"), other)
+        for bad in ("../post", ".hidden", os.path.join("a", "b")):
+            with self.assertRaises(ValueError):
+                layout_path(self.path, bad)
+        self.assertEqual(layout_paths(self.path), [self.path, other])
+        # both stay cached side by side
+        self.assertEqual(load_template(self.path).render({"Title": "T"}), "<h1>T</h1>")
+        self.assertEqual(load_template(other).render({"Content": "C"}), "<article>C</article>")
+        self.assertIs(load_template(self.path), load_template(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
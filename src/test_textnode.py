@@ -1,7 +1,14 @@
+import pickle
 import unittest
 
 from textnode import TextNode, TextType
-from inline_markdown import text_node_to_html_node, text_to_textnodes
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_node_to_html_node,
+    text_to_textnodes,
+)
 
 
 class TestTextNode(unittest.TestCase):
@@ -31,6 +38,30 @@ class TestTextNode(unittest.TestCase):
             "TextNode(This is a text node, text, https://www.boot.dev)", repr(node)
         )
 
+    def test_eq_other_type(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        self.assertNotEqual(node, "This is a text node")
+
+    def test_hashable(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        node2 = TextNode("This is a text node", TextType.BOLD)
+        self.assertEqual(hash(node), hash(node2))
+        self.assertEqual(len({node, node2, TextNode("other", TextType.BOLD)}), 2)
+        cache = {node: "<b>This is a text node</b>"}
+        self.assertEqual(cache[node2], "<b>This is a text node</b>")
+
+    def test_immutable(self):
+        node = TextNode("This is a text node", TextType.TEXT)
+        with self.assertRaises(AttributeError):
+            node.text = "changed"
+        with self.assertRaises(AttributeError):
+            node.extra = "no __dict__"
+        self.assertEqual(node.text, "This is a text node")
+
+    def test_pickle(self):
+        node = TextNode("link", TextType.LINK, "https://www.boot.dev")
+        self.assertEqual(pickle.loads(pickle.dumps(node)), node)
+
 
 class TestTextNodeToHTMLNode(unittest.TestCase):
     def test_text(self):
@@ -75,5 +106,50 @@ class TestTextToTextNodes(unittest.TestCase):
         
         self.assertEqual(text_to_textnodes(text), expected_nodes)
 
+    def test_empty_and_plain_text(self):
+        self.assertEqual(text_to_textnodes(""), [TextNode("", TextType.TEXT)])
+        self.assertEqual(text_to_textnodes("plain"), [TextNode("plain", TextType.TEXT)])
+
+    def test_code_wins_over_bold(self):
+        self.assertEqual(
+            text_to_textnodes("`a **b** c` and **d**"),
+            [
+                TextNode("a **b** c", TextType.CODE),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("d", TextType.BOLD),
+            ],
+        )
+
+    def test_image_wins_over_enclosing_link(self):
+        self.assertEqual(
+            text_to_textnodes("[x ![y](z)](w)"),
+            [
+                TextNode("[x ", TextType.TEXT),
+                TextNode("y", TextType.IMAGE, "z"),
+                TextNode("](w)", TextType.TEXT),
+            ],
+        )
+
+    def test_unbalanced_delimiter(self):
+        with self.assertRaises(ValueError):
+            text_to_textnodes("**a `b` c**")
+
+    def test_matches_chained_splits(self):
+        samples = [
+            "![a](b)[c](d)`e`**f**_g_",
+            "text [link](/x) **bold** _it_ ![img](/i.png) end",
+            "**a** `` ____ ****",
+            "![alt[inner]](u) [t[i]](v) ![](e) []()",
+            "snake_case_name and `code_with_underscores`",
+        ]
+        for text in samples:
+            nodes = [TextNode(text, TextType.TEXT)]
+            nodes = split_nodes_image(nodes)
+            nodes = split_nodes_link(nodes)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+            self.assertEqual(text_to_textnodes(text), nodes, text)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from build_plan import plan_build
+from incremental import build_assets, build_pages, load_manifest
+from tempsite import TempSiteTestCase
+from watch import Watcher, changed_paths, snapshot
+
+
+class TestSnapshot(unittest.TestCase):
+    def test_changed_paths(self):
+        old = {"a": (1, 1), "b": (1, 1), "c": (1, 1)}
+        new = {"a": (1, 1), "b": (2, 1), "d": (1, 1)}
+        self.assertEqual(changed_paths(old, new), {"b", "c", "d"})
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sub", "a.md")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "w", encoding="utf_8") as f:
+                f.write("abc")
+            self.assertEqual(list(snapshot([tmp, os.path.join(tmp, "missing")])), [path])
+
+
+class TestWatcher(TempSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, "manifest.json")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        self.write(os.path.join(self.static, "index.css"), "css")
+        plan = plan_build(self.content, self.dest, [self.static])
+        build_assets(plan, self.manifest)
+        build_pages(plan, self.template, "/", self.manifest)
+        self.watcher = Watcher(self.content, [self.static], self.template, self.dest, "/",
+                               self.manifest, interval=0.01, debounce=0.01)
+
+    def write(self, path, text):
+        super().write(path, text)
+        # make sure the change is visible even on coarse mtime filesystems
+        future = time.time() + 5
+        os.utime(path, (future, future))
+
+    def read(self, *parts):
+        with open(os.path.join(self.dest, *parts), encoding="utf_8") as f:
+            return f.read()
+
+    def step(self):
+        return self.watcher.step()
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.step(), set())
+
+    def test_changed_page_is_rerendered(self):
+        blog_mtime = os.stat(os.path.join(self.dest, "blog", "index.html")).st_mtime_ns
+        self.write(os.path.join(self.content, "index.md"), "# Home v2")
+        self.step()
+        self.assertIn("Home v2", self.read("index.html"))
+        self.assertEqual(os.stat(os.path.join(self.dest, "blog", "index.html")).st_mtime_ns, blog_mtime)
+        # the manifest is kept current, so a later incremental build has nothing to do
+        plan = plan_build(self.content, self.dest, [self.static])
+        self.assertEqual(build_pages(plan, self.template, "/", self.manifest)["rendered"], 0)
+
+    def test_added_and_removed_pages(self):
+        self.write(os.path.join(self.content, "new", "index.md"), "# New")
+        os.remove(os.path.join(self.content, "blog", "index.md"))
+        self.step()
+        self.assertIn("New", self.read("new", "index.html"))
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertEqual(sorted(load_manifest(self.manifest)["pages"]), ["index.html", "new/index.html"])
+
+    def test_template_change_rerenders_everything(self):
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.step()
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+        self.assertTrue(self.read("blog", "index.html").startswith("<h1>Blog</h1>"))
+
+    def test_layout_change_rerenders_everything(self):
+        layout = os.path.join(self.tmp.name, "layouts", "post.html")
+        self.write(layout, "<article>{{ Title }}</article>")
+        self.write(os.path.join(self.content, "blog", "index.md"), "---\nlayout: post\n---\n# Blog")
+        self.step()
+        self.assertEqual(self.read("blog", "index.html"), "<article>Blog</article>")
+        self.write(layout, "<section>{{ Title }}</section>")
+        self.step()
+        self.assertEqual(self.read("blog", "index.html"), "<section>Blog</section>")
+
+    def test_assets(self):
+        self.write(os.path.join(self.static, "index.css"), "css v2")
+        self.write(os.path.join(self.static, "img", "a.png"), "png")
+        self.step()
+        self.assertEqual(self.read("index.css"), "css v2")
+        self.assertEqual(self.read("img", "a.png"), "png")
+        os.remove(os.path.join(self.static, "img", "a.png"))
+        self.step()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "img")))
+        self.assertEqual(load_manifest(self.manifest)["assets"], ["index.css"])
+
+    def test_static_markdown_is_not_published(self):
+        self.write(os.path.join(self.static, "notes.md"), "# Notes")
+        self.step()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "notes.md")))
+        self.assertEqual(load_manifest(self.manifest)["assets"], ["index.css"])
+
+    def test_missing_template_is_retried(self):
+        os.replace(self.template, self.template + ".tmp")
+        with self.assertLogs("static_site_gen", "ERROR"):
+            self.assertIn(self.template, self.step())
+        self.write(self.template + ".tmp", "<h1>{{ Title }}</h1>{{ Content }}")
+        os.replace(self.template + ".tmp", self.template)
+        self.step()
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_vanished_asset_is_retried(self):
+        self.write(os.path.join(self.static, "index.css"), "css v2")
+        with mock.patch("watch.publish_file", side_effect=FileNotFoundError("gone")), \
+                self.assertLogs("static_site_gen", "ERROR"):
+            self.step()
+        self.assertEqual(self.read("index.css"), "css")
+        self.step()
+        self.assertEqual(self.read("index.css"), "css v2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 from enum import Enum
+from operator import attrgetter
 
 class TextType(Enum):
     TEXT = "text"
@@ -9,21 +10,32 @@ class TextType(Enum):
     IMAGE = "image"
 
 class TextNode:
+    # Immutable and hashable so nodes can be used as cache keys; __slots__
+    # keeps them small since a big site creates millions of them. The fields
+    # are read-only properties over the slots, which is much cheaper to
+    # construct than blocking __setattr__.
+    __slots__ = ("_text", "_text_type", "_url")
+
     def __init__(self, text, text_type, url = None):
-        self.text = text
-        self.text_type = text_type
-        self.url = url
+        self._text = text
+        self._text_type = text_type
+        self._url = url
+
+    text = property(attrgetter("_text"))
+    text_type = property(attrgetter("_text_type"))
+    url = property(attrgetter("_url"))
 
     def __eq__(self, other):
-        if(
-            self.text == other.text and
-            self.text_type == other.text_type and
-            self.url == other.url
-        ):
-            return True
-        return False
-            
-    
+        if not isinstance(other, TextNode):
+            return NotImplemented
+        return (
+            self._text == other._text and
+            self._text_type == other._text_type and
+            self._url == other._url
+        )
+
+    def __hash__(self):
+        return hash((self._text, self._text_type, self._url))
+
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
-
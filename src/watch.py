@@ -0,0 +1,167 @@
+import os
+import time
+from build_plan import page_rel_dest, plan_build
+from incremental import build_pages, hash_file, load_manifest, remove_output, save_manifest
+from instrument import logger
+from parallel import BuildError, render_pages
+from static_to_public import publish_file
+from template import LAYOUTS_DIR
+
+
+def snapshot(paths):
+    # {file path: (mtime_ns, size)} for every file under the given dirs/files
+    state = {}
+    for path in paths:
+        if os.path.isdir(path):
+            snapshot_dir(path, state)
+        elif os.path.isfile(path):
+            st = os.stat(path)
+            state[path] = (st.st_mtime_ns, st.st_size)
+    return state
+
+
+def snapshot_dir(path, state):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                snapshot_dir(entry.path, state)
+            elif entry.is_file():
+                st = entry.stat()
+                state[entry.path] = (st.st_mtime_ns, st.st_size)
+
+
+def changed_paths(old, new):
+    changed = {path for path, sig in new.items() if old.get(path) != sig}
+    changed.update(path for path in old if path not in new)
+    return changed
+
+
+class Watcher:
+    # Polls the content and static trees and the template, and after a burst
+    # of changes has settled re-renders or re-publishes only what they affect.
+    # A change to the template or a layout re-renders every page.
+    def __init__(self, content_dir, static_dirs, template_path, dest_dir, url_basepath,
+                 manifest_path, strategy="copy", interval=0.25, debounce=0.1):
+        self.content_dir = os.path.abspath(content_dir)
+        self.static_dirs = [os.path.abspath(d) for d in static_dirs]
+        self.template_path = os.path.abspath(template_path)
+        self.layouts_dir = os.path.join(os.path.dirname(self.template_path), LAYOUTS_DIR)
+        self.dest_dir = os.path.abspath(dest_dir)
+        self.url_basepath = url_basepath
+        self.manifest_path = manifest_path
+        self.strategy = strategy
+        self.interval = interval
+        self.debounce = debounce
+        self.state = snapshot(self.watched())
+
+    def watched(self):
+        return self.static_dirs + [self.content_dir, self.template_path, self.layouts_dir]
+
+    def poll(self):
+        # returns the changed paths once they stopped changing for `debounce`
+        # seconds, or an empty set when nothing changed
+        new = snapshot(self.watched())
+        changed = changed_paths(self.state, new)
+        while changed:
+            time.sleep(self.debounce)
+            settled = snapshot(self.watched())
+            if settled == new:
+                break
+            changed |= changed_paths(new, settled)
+            new = settled
+        self.state = new
+        return changed
+
+    def run(self):
+        logger.info("watching %s for changes, press Ctrl-C to stop", ", ".join(self.watched()))
+        try:
+            while True:
+                if not self.step():
+                    time.sleep(self.interval)
+        except KeyboardInterrupt:
+            pass
+
+    def step(self):
+        # one poll and rebuild. A file that vanishes or can't be read while
+        # rebuilding (the template being saved, an asset being moved) is
+        # logged and the old snapshot kept, so the change is retried.
+        previous = self.state
+        changed = self.poll()
+        if changed:
+            try:
+                self.rebuild(changed)
+            except OSError as e:
+                logger.error("rebuild failed, retrying: %s", e)
+                self.state = previous
+                time.sleep(self.interval)
+        return changed
+
+    def rebuild(self, changed):
+        start = time.perf_counter()
+        templates = {path for path in changed
+                     if path == self.template_path or path.startswith(self.layouts_dir + os.sep)}
+        if templates:
+            plan = plan_build(self.content_dir, self.dest_dir, [])
+            try:
+                counts = build_pages(plan, self.template_path, self.url_basepath, self.manifest_path)
+                logger.info("template changed: %d page(s) rendered in %.3fs",
+                            counts["rendered"], time.perf_counter() - start)
+            except BuildError as e:
+                logger.error("%s", e)
+            changed = {path for path in changed if path not in templates
+                       and not (path.startswith(self.content_dir + os.sep) and path.endswith(".md"))}
+
+        manifest = load_manifest(self.manifest_path)
+        pages = []
+        assets = set()
+        for path in sorted(changed):
+            if path.startswith(self.content_dir + os.sep):
+                rel = os.path.relpath(path, self.content_dir)
+                if path.endswith(".md"):
+                    pages.append((path, rel))
+                else:
+                    assets.add(rel)
+            elif not path.endswith(".md"):
+                # markdown in a static dir is never published, like in plan_build
+                for static_dir in self.static_dirs:
+                    if path.startswith(static_dir + os.sep):
+                        assets.add(os.path.relpath(path, static_dir))
+
+        render = []
+        for src, rel in pages:
+            rel_dest = page_rel_dest(rel)
+            if os.path.isfile(src):
+                manifest["pages"][rel_dest] = {"source": rel, "hash": hash_file(src)}
+                render.append((src, os.path.join(self.dest_dir, rel_dest)))
+            elif rel_dest in manifest["pages"]:
+                del manifest["pages"][rel_dest]
+                remove_output(self.dest_dir, rel_dest)
+        failures = render_pages(render, self.template_path, self.url_basepath)
+        for src, error in failures:
+            logger.error("%s: %s", src, error)
+            del manifest["pages"][page_rel_dest(os.path.relpath(src, self.content_dir))]
+
+        published = set(manifest["assets"])
+        for rel_dest in sorted(assets):
+            src = self.asset_source(rel_dest)
+            dest = os.path.join(self.dest_dir, rel_dest)
+            if src is None:
+                if rel_dest in published:
+                    published.discard(rel_dest)
+                    remove_output(self.dest_dir, rel_dest)
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            publish_file(src, dest, self.strategy)
+            published.add(rel_dest)
+        manifest["assets"] = sorted(published)
+        save_manifest(self.manifest_path, manifest)
+        logger.info("%d page(s) and %d asset(s) updated in %.3fs",
+                    len(render) - len(failures), len(assets), time.perf_counter() - start)
+
+    def asset_source(self, rel_dest):
+        # content wins over static, like in plan_build
+        for root in [self.content_dir] + self.static_dirs[::-1]:
+            path = os.path.join(root, rel_dest)
+            if os.path.isfile(path):
+                return path
+        return None